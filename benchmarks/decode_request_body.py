@@ -0,0 +1,89 @@
+"""
+Benchmark of the decoding of captured request bodies.
+
+Compares ast.literal_eval, which the POST body assertions used before, with decode_body and the
+cached decode_request_body over a corpus of app_motor_control and app_automatic_command bodies.
+
+Run from the repository root:
+    python -m benchmarks.decode_request_body
+"""
+import ast
+import itertools
+import json
+import timeit
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from features.request_body import decode_body, decode_request_body, DECODED_BODY_CACHE, \
+    FORM_CONTENT_TYPE
+
+MOTORS = ["pitch", "lift", "rotation", "case", "drone_position"]
+MOTOR_COMMANDS = ["up", "down", "left", "right", "forward", "backward", "stop", "min"]
+AUTOMATIC_COMMANDS = ["load", "rest", "prepare", "launch", "stop"]
+REPETITIONS = 5
+NUMBER = 200
+
+
+def create_corpus():
+    """Returns a list of (body, content type) as posted by the GUI and by the API steps."""
+    corpus = []
+    for motor, command in itertools.product(MOTORS, MOTOR_COMMANDS):
+        body = {"motor": motor, "command": command}
+        corpus.append((json.dumps(body).encode("utf-8"), "application/json"))
+        corpus.append((urlencode(body).encode("utf-8"), FORM_CONTENT_TYPE))
+    for position in range(0, 1000, 50):
+        body = {"motor": "drone_position", "command": "position", "position": str(position)}
+        corpus.append((json.dumps(body).encode("utf-8"), "application/json"))
+    for command in AUTOMATIC_COMMANDS:
+        corpus.append((json.dumps({"command": command}).encode("utf-8"), "application/json"))
+    return corpus
+
+
+def create_requests(corpus):
+    """Wraps the corpus in objects with the attributes of selenium-wire requests."""
+    return [SimpleNamespace(id=index, body=body, headers={"Content-Type": content_type})
+            for index, (body, content_type) in enumerate(corpus)]
+
+
+def literal_eval_all(corpus):
+    for body, content_type in corpus:
+        # ast.literal_eval can only decode the json bodies that are also Python literals
+        if content_type != FORM_CONTENT_TYPE:
+            ast.literal_eval(body.decode("utf-8"))
+
+
+def decode_all(corpus):
+    for body, content_type in corpus:
+        decode_body(body, content_type)
+
+
+def decode_cached_all(requests):
+    for request in requests:
+        decode_request_body(request)
+
+
+def measure(function, argument, bodies):
+    """Returns the best time per body in microseconds."""
+    best_time = min(timeit.repeat(lambda: function(argument), repeat=REPETITIONS, number=NUMBER))
+    return best_time / (NUMBER * bodies) * 1e6
+
+
+def main():
+    corpus = create_corpus()
+    requests = create_requests(corpus)
+    json_corpus = [item for item in corpus if item[1] != FORM_CONTENT_TYPE]
+    DECODED_BODY_CACHE.clear()
+
+    results = {
+        "ast.literal_eval (json bodies)": measure(literal_eval_all, json_corpus, len(json_corpus)),
+        "decode_body (json bodies)": measure(decode_all, json_corpus, len(json_corpus)),
+        "decode_body (all bodies)": measure(decode_all, corpus, len(corpus)),
+        "decode_request_body (cached)": measure(decode_cached_all, requests, len(requests)),
+    }
+    print(f"Corpus: {len(corpus)} bodies, {len(json_corpus)} json")
+    for name, time_per_body in results.items():
+        print(f"{name:<32} {time_per_body:8.2f} us/body")
+
+
+if __name__ == "__main__":
+    main()
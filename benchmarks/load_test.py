@@ -0,0 +1,234 @@
+"""
+Load test of the motor control and automatic command endpoints.
+
+Simulates several phones controlling the launcher at once. Each client repeatedly either holds
+and releases a manual motor button (a form encoded motor command followed by stop, as posted to
+/app_motor_control) or clicks an automatic command (json posted to /app_automatic_command).
+Throughput and p50/p95/p99 latency are reported per endpoint and per motor as json.
+
+Against a running launcher, preferably started with simulated motors:
+    python -m benchmarks.load_test --url http://localhost:5000 --clients 4 --duration 10
+
+In process, e.g. from a behave environment where the motors have been simulated:
+    run_load_test(AppPoster(context.server.get_app()), clients=4, duration=10)
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Manual motor requests per motor, the button is released by posting stop
+MOTOR_REQUESTS = {
+    "pitch": ["up", "down"],
+    "lift": ["up", "down"],
+    "rotation": ["left", "right"],
+    "case": ["open", "close"],
+    "drone_position": ["forward", "backward"],
+}
+# Launch is left out by default since it requires a prepared launcher
+AUTOMATIC_COMMANDS = ["load", "rest", "prepare", "stop"]
+DEFAULT_MIX = "hold_release=9,automatic_command=1"
+PERCENTILES = [50, 95, 99]
+REQUEST_TIMEOUT = 10
+
+
+class HttpPoster:
+    """Posts requests to a running launcher server"""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def post(self, complete_command, parameters=None, use_json=False):
+        """Posts a request in the same way as post_request in the steps, returns the status code."""
+        if use_json:
+            body = json.dumps(parameters).encode("utf-8")
+            content_type = "application/json"
+        else:
+            body = urllib.parse.urlencode(parameters or {}).encode("utf-8")
+            content_type = "application/x-www-form-urlencoded"
+        request = urllib.request.Request(f"{self.url}/app_{complete_command}", data=body,
+                                         headers={"Content-Type": content_type})
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as err:
+            return err.code
+
+
+class AppPoster:
+    """Posts requests to a Flask app in the same process, with one test client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, complete_command, parameters=None, use_json=False):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client(use_cookies=False)
+        request = f"/app_{complete_command}"
+        if use_json:
+            response = self._local.client.post(request, json=parameters)
+        else:
+            response = self._local.client.post(request, data=parameters)
+        return response.status_code
+
+
+class LoadTestResults:
+    """Thread safe collection of request latencies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+
+    def add(self, endpoint, motor, latency, status_code):
+        with self._lock:
+            self.samples.append((endpoint, motor, latency, status_code))
+
+    def summarize(self, duration):
+        """Returns throughput, error count and latency percentiles per endpoint and per motor."""
+        by_endpoint = {}
+        by_motor = {}
+        for endpoint, motor, latency, status_code in self.samples:
+            by_endpoint.setdefault(endpoint, []).append((latency, status_code))
+            if motor is not None:
+                by_motor.setdefault(motor, []).append((latency, status_code))
+        return {"endpoints": {name: summarize_samples(samples, duration)
+                              for name, samples in sorted(by_endpoint.items())},
+                "motors": {name: summarize_samples(samples, duration)
+                           for name, samples in sorted(by_motor.items())}}
+
+
+def summarize_samples(samples, duration):
+    latencies = sorted(latency for latency, _ in samples)
+    summary = {"requests": len(samples),
+               "errors": sum(1 for _, status_code in samples if status_code != 200),
+               "throughput": len(samples) / duration if duration else 0.0}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}"] = percentile_of(latencies, percentile)
+    return summary
+
+
+def percentile_of(sorted_values, percentile):
+    """Returns the nearest-rank percentile of sorted values."""
+    if not sorted_values:
+        return None
+    # Multiplied before dividing, so that exact ranks are not rounded up by float errors
+    rank = max(math.ceil(percentile * len(sorted_values) / 100), 1)
+    return sorted_values[rank - 1]
+
+
+def parse_mix(mix):
+    """Parses a mix like 'hold_release=9,automatic_command=1' to a dict of weights."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("hold_release", "automatic_command"):
+            raise ValueError(f"Incorrect value for mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def timed_post(poster, results, endpoint, parameters, use_json, motor=None):
+    start_time = time.perf_counter()
+    try:
+        status_code = poster.post(endpoint, parameters, use_json)
+    except OSError:
+        status_code = None
+    results.add(endpoint, motor, time.perf_counter() - start_time, status_code)
+
+
+def run_client(poster, results, end_time, mix, motors, automatic_commands, hold_time, seed):
+    """Sends requests like one phone until end_time."""
+    randomizer = random.Random(seed)
+    actions = list(mix)
+    weights = [mix[action] for action in actions]
+    while time.monotonic() < end_time:
+        action = randomizer.choices(actions, weights)[0]
+        if action == "hold_release":
+            motor = randomizer.choice(motors)
+            command = randomizer.choice(MOTOR_REQUESTS[motor])
+            timed_post(poster, results, "motor_control", {"motor": motor, "command": command},
+                       False, motor)
+            if hold_time:
+                time.sleep(hold_time)
+            timed_post(poster, results, "motor_control", {"motor": motor, "command": "stop"},
+                       False, motor)
+        else:
+            command = randomizer.choice(automatic_commands)
+            timed_post(poster, results, "automatic_command", {"command": command}, True)
+
+
+def run_load_test(poster, clients=4, duration=10.0, mix=DEFAULT_MIX, motors=None,
+                  automatic_commands=None, hold_time=0.0, seed=0):
+    """
+    Runs concurrent clients against the launcher and returns the results as a dict.
+    :param poster: HttpPoster or AppPoster
+    :param clients: Number of concurrent clients
+    :param duration: Time in seconds to send requests
+    :param mix: Relative weights of hold_release and automatic_command actions
+    :param motors: Motors to control, default all
+    :param automatic_commands: Automatic commands to send, default AUTOMATIC_COMMANDS
+    :param hold_time: Time in seconds between a motor command and its stop
+    :param seed: Seed for the random choice of actions, each client uses seed + client number
+    """
+    motors = motors or list(MOTOR_REQUESTS)
+    automatic_commands = automatic_commands or AUTOMATIC_COMMANDS
+    weights = parse_mix(mix)
+    results = LoadTestResults()
+
+    start_time = time.monotonic()
+    end_time = start_time + duration
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [executor.submit(run_client, poster, results, end_time, weights, motors,
+                                   automatic_commands, hold_time, seed + client)
+                   for client in range(clients)]
+        for future in futures:
+            future.result()
+    elapsed_time = time.monotonic() - start_time
+
+    report = {"config": {"clients": clients, "duration": elapsed_time, "mix": weights,
+                         "motors": motors, "automatic_commands": automatic_commands,
+                         "hold_time": hold_time}}
+    report.update(results.summarize(elapsed_time))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000", help="launcher server URL")
+    parser.add_argument("--clients", type=int, default=4, help="number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="test time in seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"relative weights of the actions (default: {DEFAULT_MIX})")
+    parser.add_argument("--motors", default=",".join(MOTOR_REQUESTS),
+                        help="comma separated motors to control")
+    parser.add_argument("--automatic-commands", default=",".join(AUTOMATIC_COMMANDS),
+                        help="comma separated automatic commands to send")
+    parser.add_argument("--hold-time", type=float, default=0.0,
+                        help="seconds between a motor command and its stop")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random actions")
+    parser.add_argument("--output", help="json file for the results (default: stdout)")
+    args = parser.parse_args()
+
+    report = run_load_test(HttpPoster(args.url), args.clients, args.duration, args.mix,
+                           args.motors.split(","), args.automatic_commands.split(","),
+                           args.hold_time, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark of the matching of step texts to the step implementations.
+
+Compares behave's linear scan over all patterns of a step type with the StepDispatchIndex,
+without and with the cache per step text, over all step texts in the features. Also reports the
+time to build the index and the step texts that match more than one pattern.
+
+Run from the repository root:
+    python -m benchmarks.step_dispatch
+"""
+import glob
+import os
+import time
+import timeit
+
+from behave.parser import parse_file
+
+from features.step_dispatch import StepDispatchIndex
+from run_features import FEATURE_DIRECTORY, STEP_DECORATORS, StepIndex
+
+REPETITIONS = 5
+NUMBER = 20
+
+
+def collect_step_texts(feature_directory=FEATURE_DIRECTORY):
+    """Returns (step_type, step text) of every step run by the features, with repetitions."""
+    step_texts = []
+    for feature_file in sorted(glob.glob(os.path.join(feature_directory, "*.feature"))):
+        feature = parse_file(feature_file)
+        if feature is None:
+            continue
+        # All scenarios, including the scenarios in rules and all outline examples
+        for scenario in feature.walk_scenarios():
+            step_texts.extend((step.step_type, step.name) for step in scenario.all_steps)
+    return step_texts
+
+
+def linear_match(candidates, step_texts):
+    for step_type, text in step_texts:
+        next((step for parser, step in candidates[step_type] if parser.parse(text) is not None),
+             None)
+
+
+def indexed_match(candidates, indexes, step_texts):
+    for step_type, text in step_texts:
+        step_candidates = candidates[step_type]
+        next((step_candidates[number][1] for number in indexes[step_type].candidates(text)
+              if step_candidates[number][0].parse(text) is not None), None)
+
+
+def cached_match(step_index, step_texts):
+    for step_type, text in step_texts:
+        step_index.find_step(step_type, text)
+
+
+def measure(function, *arguments, steps):
+    """Returns the best time per step in microseconds."""
+    best_time = min(timeit.repeat(lambda: function(*arguments), repeat=REPETITIONS,
+                                  number=NUMBER))
+    return best_time / (NUMBER * steps) * 1e6
+
+
+def main():
+    step_index = StepIndex()
+    step_texts = collect_step_texts()
+    candidates = {step_type: step_index._candidates(step_type)  # pylint: disable=protected-access
+                  for step_type in STEP_DECORATORS}
+
+    start_time = time.perf_counter()
+    indexes = {step_type: StepDispatchIndex(pattern for _, (_, pattern) in candidates[step_type])
+               for step_type in STEP_DECORATORS}
+    build_time = time.perf_counter() - start_time
+
+    mismatches = [(step_type, text) for step_type, text in step_texts
+                  if step_index.find_step(step_type, text)
+                  != next((step for parser, step in candidates[step_type]
+                           if parser.parse(text) is not None), None)]
+    ambiguous_steps = {}
+    for step_type, text in set(step_texts):
+        patterns = [pattern for parser, (_, pattern) in candidates[step_type]
+                    if parser.parse(text) is not None]
+        if len(patterns) > 1:
+            ambiguous_steps[(step_type, text)] = patterns
+
+    results = {
+        "linear scan": measure(linear_match, candidates, step_texts, steps=len(step_texts)),
+        "dispatch index": measure(indexed_match, candidates, indexes, step_texts,
+                                  steps=len(step_texts)),
+        "dispatch index (cached)": measure(cached_match, step_index, step_texts,
+                                           steps=len(step_texts)),
+    }
+    print(f"Steps: {len(step_texts)} run, {len(set(step_texts))} distinct, "
+          f"index built in {build_time * 1e3:.2f} ms, {len(mismatches)} mismatches")
+    for name, time_per_step in results.items():
+        print(f"{name:<24} {time_per_step:8.2f} us/step")
+    for (step_type, text), patterns in sorted(ambiguous_steps.items()):
+        print(f"Ambiguous {step_type} step '{text}' matches: "
+              + ", ".join(f"'{pattern}'" for pattern in patterns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark of the per-request latency of the API steps with a reused Flask test client.
+
+Compares a new app.test_client() per request, which the API steps used before, with one cached
+client for all requests, for the motor_control, automatic_command, launch and measurements
+endpoints. The requests are the same as the ones made by post_request and the measurements
+step.
+
+The app is created by the launcher server, so the benchmark is run in process, e.g. from a
+behave environment where the motors have been mocked or simulated:
+    print_test_client_benchmark(run_test_client_benchmark(context.server.get_app()))
+"""
+import timeit
+
+REPETITIONS = 5
+NUMBER = 200
+
+# Request per endpoint as (method, path, keyword arguments of the test client call)
+ENDPOINT_REQUESTS = {
+    "motor_control": ("post", "/app_motor_control", {"data": {"motor": "pitch",
+                                                              "command": "stop"}}),
+    "automatic_command": ("post", "/app_automatic_command", {"json": {"command": "stop"}}),
+    "launch": ("post", "/app_launch", {"data": None}),
+    "measurements": ("get", "/measurements", {}),
+}
+
+
+def request_with_new_client(app, method, path, kwargs):
+    return getattr(app.test_client(), method)(path, **kwargs)
+
+
+def request_with_cached_client(client, method, path, kwargs):
+    return getattr(client, method)(path, **kwargs)
+
+
+def measure(function, *arguments):
+    """Returns the best time per request in microseconds."""
+    best_time = min(timeit.repeat(lambda: function(*arguments), repeat=REPETITIONS,
+                                  number=NUMBER))
+    return best_time / NUMBER * 1e6
+
+
+def run_test_client_benchmark(app, endpoints=None):
+    """
+    Measures the latency per request with a new and with a cached test client.
+    :param app: Flask app of the launcher server
+    :param endpoints: Endpoints to measure, default all in ENDPOINT_REQUESTS
+    :return: Dict with the new client and cached client latency in microseconds per endpoint
+    """
+    cached_client = app.test_client(use_cookies=False)
+    results = {}
+    for endpoint in endpoints or ENDPOINT_REQUESTS:
+        method, path, kwargs = ENDPOINT_REQUESTS[endpoint]
+        results[endpoint] = {
+            "new client": measure(request_with_new_client, app, method, path, kwargs),
+            "cached client": measure(request_with_cached_client, cached_client, method, path,
+                                     kwargs),
+        }
+    return results
+
+
+def print_test_client_benchmark(results):
+    for endpoint, latencies in results.items():
+        speedup = latencies["new client"] / latencies["cached client"]
+        print(f"{endpoint:<20} new client {latencies['new client']:8.1f} us/request, "
+              f"cached client {latencies['cached client']:8.1f} us/request ({speedup:.2f}x)")
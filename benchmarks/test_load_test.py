@@ -0,0 +1,37 @@
+"""
+Tests of the load test statistics
+"""
+import pytest
+
+from benchmarks.load_test import percentile_of, parse_mix, summarize_samples
+
+
+def test_percentile_of_uses_nearest_rank():
+    assert percentile_of([1, 2, 3, 4, 5], 50) == 3
+    assert percentile_of([1, 2, 3, 4], 50) == 2
+    assert percentile_of([1, 2, 3, 4, 5], 100) == 5
+    assert percentile_of([1, 2, 3, 4, 5], 0) == 1
+
+
+def test_percentile_of_high_percentiles():
+    samples = list(range(1, 151))
+    assert percentile_of(samples, 99) == 149
+    assert percentile_of(samples, 95) == 143
+    assert percentile_of(list(range(1, 101)), 95) == 95
+
+
+def test_percentile_of_no_samples():
+    assert percentile_of([], 50) is None
+
+
+def test_summarize_samples():
+    summary = summarize_samples([(0.3, 200), (0.1, 200), (0.2, 500)], duration=2.0)
+    assert summary == {"requests": 3, "errors": 1, "throughput": 1.5,
+                       "p50": 0.2, "p95": 0.3, "p99": 0.3}
+
+
+def test_parse_mix():
+    assert parse_mix("hold_release=9,automatic_command=1") == {"hold_release": 9.0,
+                                                               "automatic_command": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("launch=1")
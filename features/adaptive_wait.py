@@ -0,0 +1,120 @@
+"""
+Adaptive waiting for conditions in the browser, with statistics on how long the waits took.
+
+The condition is evaluated densely at first and then with an exponentially increasing interval,
+so that short time budgets get many evaluations and long waits do not waste WebDriver round
+trips. The time it took for each condition to be satisfied is recorded per label and can be
+exported as a histogram.
+
+Wait times are also recorded per step, under "step: <step>", when the before_step and after_step
+hooks call enter_step(f"{step.keyword} {step.name}") and exit_step(). Waits in steps executed
+from other steps with execute_steps are recorded for the innermost step. The running steps are
+also used by the step profiler, whose hooks call enter_step and exit_step themselves.
+"""
+import json
+import time
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+FIRST_POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.2
+POLL_BACKOFF_FACTOR = 2
+
+# Upper bounds in seconds of the histogram buckets, longer waits are counted in the last bucket
+HISTOGRAM_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0]
+
+# Recorded wait times in seconds and number of timeouts, per label
+WAIT_TIMES = {}
+WAIT_TIMEOUTS = {}
+# Steps being executed, nested steps last, with their start time and (label, wait time) waits
+RUNNING_STEPS = []
+STEP_LABEL_PREFIX = "step: "
+
+
+def enter_step(step_name):
+    """Marks the start of a step, waits are then also recorded for the step."""
+    RUNNING_STEPS.append({"name": step_name, "start_time": time.perf_counter(), "waits": []})
+
+
+def exit_step():
+    """
+    Marks the end of the innermost running step.
+    :return: The step with its name, perf_counter start time and waits, or None
+    """
+    if RUNNING_STEPS:
+        return RUNNING_STEPS.pop()
+    return None
+
+
+def _labels(label):
+    if RUNNING_STEPS:
+        return [label, STEP_LABEL_PREFIX + RUNNING_STEPS[-1]["name"]]
+    return [label]
+
+
+def wait_until(driver, condition, response_time, label, message=""):
+    """
+    Waits until the condition returns a truthy value and returns that value.
+    NoSuchElementException from the condition is treated as not yet satisfied.
+    :param driver: webdriver passed to the condition
+    :param condition: Callable taking the driver, e.g. an expected condition
+    :param response_time: Time in seconds to wait for the condition
+    :param label: Name under which the wait time is recorded
+    :param message: Message of the TimeoutException if the condition is not satisfied in time
+    """
+    start_time = time.monotonic()
+    end_time = start_time + response_time
+    poll_interval = FIRST_POLL_INTERVAL
+    while True:
+        try:
+            value = condition(driver)
+            if value:
+                record_wait_time(label, time.monotonic() - start_time)
+                return value
+        except NoSuchElementException:
+            pass
+
+        remaining_time = end_time - time.monotonic()
+        if remaining_time <= 0:
+            for timeout_label in _labels(label):
+                WAIT_TIMEOUTS[timeout_label] = WAIT_TIMEOUTS.get(timeout_label, 0) + 1
+            raise TimeoutException(message)
+        time.sleep(min(poll_interval, remaining_time))
+        poll_interval = min(poll_interval * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+
+
+def record_wait_time(label, wait_time):
+    """
+    Records the time in seconds it took for a condition to be satisfied, for the label and for
+    the running step.
+    """
+    for wait_label in _labels(label):
+        WAIT_TIMES.setdefault(wait_label, []).append(wait_time)
+    if RUNNING_STEPS:
+        RUNNING_STEPS[-1]["waits"].append((label, wait_time))
+
+
+def get_wait_time_histogram():
+    """
+    Returns the recorded wait times as a histogram per label.
+    :return: Dict with count, max, timeouts and the number of waits per bucket for each label
+    """
+    histogram = {}
+    for label in sorted(set(WAIT_TIMES) | set(WAIT_TIMEOUTS)):
+        wait_times = WAIT_TIMES.get(label, [])
+        buckets = {str(bucket): 0 for bucket in HISTOGRAM_BUCKETS}
+        for wait_time in wait_times:
+            bucket = next((bucket for bucket in HISTOGRAM_BUCKETS if wait_time <= bucket),
+                          HISTOGRAM_BUCKETS[-1])
+            buckets[str(bucket)] += 1
+        histogram[label] = {"count": len(wait_times),
+                            "max": max(wait_times, default=0.0),
+                            "timeouts": WAIT_TIMEOUTS.get(label, 0),
+                            "buckets": buckets}
+    return histogram
+
+
+def export_wait_time_histogram(file_name):
+    """Writes the wait time histogram to a json file, e.g. from an after_all hook."""
+    with open(file_name, "w", encoding="utf-8") as file:
+        json.dump(get_wait_time_histogram(), file, indent=2)
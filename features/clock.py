@@ -0,0 +1,101 @@
+"""
+Clocks used for timing in the steps.
+
+The wall clock is used for hardware and browser runs. The simulated clock lets scenarios that
+only use the app and launcher model advance time instantly. The clock is selected with behave
+userdata, e.g. "-D clock=simulated", or set by the environment as context.clock so that it can
+be shared with the launcher model. The simulated motors use the simulated clock when it is
+selected, see install_simulated_motors.
+
+The simulated clock cannot be used together with a browser, since the browser and the server
+handling its requests run in real time. Waits for work on other threads, like negative
+assertions that a call is not made, shall use WALL_CLOCK directly.
+"""
+import threading
+import time
+
+CLOCK_USERDATA = "clock"
+
+
+class WallClock:
+    """Clock using the real time"""
+
+    @staticmethod
+    def monotonic():
+        return time.monotonic()
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(seconds)
+
+
+class SimulatedClock:
+    """
+    Clock where time only advances when someone sleeps, without any real waiting.
+    Threads waiting with wait_until are woken up when the time has been advanced far enough.
+    """
+
+    def __init__(self, start_time=0.0):
+        self._now = start_time
+        self._condition = threading.Condition()
+
+    def monotonic(self):
+        with self._condition:
+            return self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        """Moves the time forward and wakes up the threads waiting for it."""
+        with self._condition:
+            self._now += max(seconds, 0)
+            self._condition.notify_all()
+
+    def wait_until(self, deadline, timeout=None):
+        """
+        Blocks until the simulated time has reached deadline.
+        :param deadline: Simulated time to wait for
+        :param timeout: Maximum real time in seconds to wait
+        :return: True if the deadline was reached
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._now >= deadline, timeout)
+
+
+class AcceleratedClock:
+    """Clock running time_factor times faster than the real time, e.g. for simulated motors"""
+
+    def __init__(self, time_factor=1.0):
+        if time_factor <= 0:
+            raise ValueError("Time factor must be positive")
+        self.time_factor = time_factor
+        self._start_time = time.monotonic()
+
+    def monotonic(self):
+        return (time.monotonic() - self._start_time) * self.time_factor
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.time_factor)
+
+
+WALL_CLOCK = WallClock()
+CLOCKS = {"wall": lambda: WALL_CLOCK, "simulated": SimulatedClock}
+
+
+def get_clock(context):
+    """
+    Returns the clock of the test run. A clock set by the environment as context.clock is used
+    if present, otherwise the clock selected in the userdata, by default the wall clock.
+    Raises ValueError if a simulated clock is used together with a browser.
+    """
+    clock = getattr(context, "clock", None)
+    if clock is None:
+        clock_name = context.config.userdata.get(CLOCK_USERDATA, "wall")
+        if clock_name not in CLOCKS:
+            raise ValueError(f"Incorrect value for clock: {clock_name}")
+        clock = CLOCKS[clock_name]()
+        context.clock = clock
+    if isinstance(clock, SimulatedClock) and getattr(context, "browser", None):
+        raise ValueError("The simulated clock cannot be used with a browser, use the wall clock")
+    return clock
@@ -0,0 +1,40 @@
+"""
+Decoding of request bodies captured by selenium-wire
+"""
+import json
+from urllib.parse import parse_qsl
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+
+# Decoded bodies by request id, cleared when it reaches the maximum size
+DECODED_BODY_CACHE = {}
+DECODED_BODY_CACHE_SIZE = 1000
+
+
+def decode_request_body(request):
+    """
+    Returns the body of a captured request as a dict.
+    The body is decoded once per request and then served from the cache. Requests without id,
+    like the ones passed to selenium-wire interceptors, are decoded every time.
+    :param request: Request captured by selenium-wire
+    """
+    if request.id is None:
+        return decode_body(request.body, request.headers.get("Content-Type", ""))
+    decoded_body = DECODED_BODY_CACHE.get(request.id)
+    if decoded_body is None:
+        if len(DECODED_BODY_CACHE) >= DECODED_BODY_CACHE_SIZE:
+            DECODED_BODY_CACHE.clear()
+        decoded_body = decode_body(request.body, request.headers.get("Content-Type", ""))
+        DECODED_BODY_CACHE[request.id] = decoded_body
+    return decoded_body
+
+
+def decode_body(body, content_type=""):
+    """
+    Decodes a raw request body, form encoded bodies are returned with one value per key.
+    :param body: Raw body as bytes
+    :param content_type: Content-Type header of the request, json is assumed if not form encoded
+    """
+    if content_type.startswith(FORM_CONTENT_TYPE):
+        return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+    return json.loads(body)
@@ -0,0 +1,147 @@
+"""
+Index of the requests captured by selenium-wire in the browser, grouped by endpoint path.
+
+The log is fed by request and response interceptors on the browser, so the assertions do not
+have to read the captured requests. Requests are numbered in the order they are captured and are
+added to the index when their response has been received, the same requests that selenium-wire's
+wait_for_request considers. The numbers are used as cursors to find the requests made after a
+certain point, e.g. a click.
+
+selenium-wire only gives a request its id when it is stored, after the request interceptor, and
+passes a new request object to the response interceptor. Responses are therefore matched with
+the captured requests by method, URL and body, in capture order. Requests that are equal in all
+of these are interchangeable for the assertions.
+"""
+import bisect
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+
+
+def request_key(request):
+    """Returns the key that identifies a request in both the request and response interceptor."""
+    return request.method, request.url, bytes(request.body or b"")
+
+
+class RequestLog:
+    """Index of the captured requests of a browser, see the module documentation"""
+
+    def __init__(self, browser):
+        self._browser = browser
+        self._condition = threading.Condition()
+        self._clear()
+        # Interceptors set up by the environment are still called
+        self._request_interceptor = getattr(browser, "request_interceptor", None)
+        self._response_interceptor = getattr(browser, "response_interceptor", None)
+        browser.request_interceptor = self._intercept_request
+        browser.response_interceptor = self._intercept_response
+
+    def _clear(self):
+        self._next_number = 0
+        # Requests without response by capture number, and their capture numbers by request key
+        self._pending = {}
+        self._pending_numbers = {}
+        # Capture numbers and requests with response per path, in capture order
+        self._numbers_by_path = {}
+        self._requests_by_path = {}
+
+    def synchronize(self):
+        """Rebuilds the log from the requests captured by selenium-wire."""
+        captured = self._browser.requests
+        with self._condition:
+            self._clear()
+            for request in captured:
+                if request.response is None:
+                    self._add_request(request)
+                else:
+                    self._index(self._take_number(), request)
+
+    def _intercept_request(self, request):
+        if self._request_interceptor is not None:
+            self._request_interceptor(request)
+        with self._condition:
+            self._add_request(request)
+
+    def _intercept_response(self, request, response):
+        if self._response_interceptor is not None:
+            self._response_interceptor(request, response)
+        with self._condition:
+            self._add_response(request)
+            self._condition.notify_all()
+
+    def _take_number(self):
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _add_request(self, request):
+        number = self._take_number()
+        self._pending[number] = request
+        self._pending_numbers.setdefault(request_key(request), deque()).append(number)
+
+    def _add_response(self, request):
+        pending_numbers = self._pending_numbers.get(request_key(request))
+        if pending_numbers:
+            number = pending_numbers.popleft()
+            del self._pending[number]
+        else:
+            # Captured while the log was synchronized
+            number = self._take_number()
+        self._index(number, request)
+
+    def _index(self, number, request):
+        numbers = self._numbers_by_path.setdefault(request.path, [])
+        index = bisect.bisect(numbers, number)
+        numbers.insert(index, number)
+        self._requests_by_path.setdefault(request.path, []).insert(index, request)
+
+    def position(self):
+        """Returns the number of the next captured request, to be used as cursor."""
+        with self._condition:
+            return self._next_number
+
+    def find(self, url, cursor=0):
+        """
+        Returns the requests with response to the path of url from the cursor position and on,
+        in capture order.
+        """
+        with self._condition:
+            return self._find(urlsplit(url).path, cursor)
+
+    def _find(self, path, cursor):
+        index = bisect.bisect_left(self._numbers_by_path.get(path, []), cursor)
+        return self._requests_by_path.get(path, [])[index:]
+
+    def find_pending(self, url):
+        """Returns the captured requests to the path of url that have not got a response yet."""
+        path = urlsplit(url).path
+        with self._condition:
+            return [request for request in self._pending.values() if request.path == path]
+
+    def wait_for_next(self, url, cursor, timeout):
+        """
+        Waits for the first request to the path of url from the cursor position and on, in
+        capture order, to get its response.
+        :param url: URL of the endpoint
+        :param cursor: Position in the log, as returned by position()
+        :param timeout: Time in seconds to wait for the request
+        :return: The request
+        """
+        path = urlsplit(url).path
+        with self._condition:
+            request = self._condition.wait_for(lambda: self._find_next(path, cursor), timeout)
+        if request is None:
+            raise TimeoutException(f"Timed out after {timeout}s waiting for request {url}")
+        return request
+
+    def _find_next(self, path, cursor):
+        """Returns the first captured request from the cursor on, once it has got its response."""
+        numbers = self._numbers_by_path.get(path, [])
+        index = bisect.bisect_left(numbers, cursor)
+        first_pending = min((number for number, request in self._pending.items()
+                             if request.path == path and number >= cursor), default=None)
+        if index < len(numbers) and (first_pending is None or numbers[index] < first_pending):
+            return self._requests_by_path[path][index]
+        return None
@@ -0,0 +1,332 @@
+"""
+Kinematic simulation of the launcher motors, used instead of the EPOS and Roboclaw motors when
+no hardware is available.
+
+The motors move with limited velocity and acceleration between their min and max positions and
+take some time to react to stop. The motion is computed from a clock, by default an accelerated
+clock so that moves finish faster than in real time. Simulated motors are selected with behave
+userdata "-D motors=simulated", and the time factor with "-D motor_time_factor=<factor>".
+
+With "-D clock=simulated" the motors use the simulated clock of the test run instead, see
+features/clock.py. Time then only advances when someone sleeps on that clock, e.g. the launcher
+waiting for a motor to stop, so complete moves finish without any real waiting.
+
+The drone_position motor is sampled by a PositionSampler after every command, so that waiting
+for it to stop is signalled by the sampler instead of a sleep-poll loop. The sample rate is set
+with "-D motor_sample_rate=<Hz>". The sampler samples in real time, so it is not used with the
+simulated clock.
+"""
+import math
+import threading
+import time
+from collections import deque
+from unittest.mock import Mock
+
+from features.clock import AcceleratedClock, SimulatedClock, get_clock
+
+MOTORS_USERDATA = "motors"
+TIME_FACTOR_USERDATA = "motor_time_factor"
+DEFAULT_TIME_FACTOR = 10.0
+
+# Time step in seconds (in motor time) used when integrating the motion
+INTEGRATION_STEP = 0.001
+# Interval in seconds (in motor time) between checks in wait_until_motor_stopped
+STOPPED_POLL_INTERVAL = 0.01
+DEFAULT_STOPPED_TIMEOUT = 30
+
+SAMPLE_RATE_USERDATA = "motor_sample_rate"
+DEFAULT_SAMPLE_RATE = 200
+SAMPLE_BUFFER_SIZE = 512
+# Number of consecutive samples without motion before the motor is considered settled
+SETTLE_SAMPLES = 5
+SAMPLED_MOTORS = ["drone_position"]
+
+# Limits per motor: max velocity (units/s), acceleration (units/s^2), min and max position and the
+# time in seconds between a stop command and the start of the deceleration
+MOTOR_LIMITS = {
+    "pitch": {"max_velocity": 200, "acceleration": 800, "min_position": 0,
+              "max_position": 1000, "stop_latency": 0.01},
+    "lift": {"max_velocity": 200, "acceleration": 800, "min_position": 0,
+             "max_position": 1000, "stop_latency": 0.01},
+    "rotation": {"max_velocity": 300, "acceleration": 1200, "min_position": -1000,
+                 "max_position": 1000, "stop_latency": 0.01},
+    "case1": {"max_velocity": 150, "acceleration": 600, "min_position": 0,
+              "max_position": 1000, "stop_latency": 0.01},
+    "case2": {"max_velocity": 150, "acceleration": 600, "min_position": 0,
+              "max_position": 1000, "stop_latency": 0.01},
+    "drone_position": {"max_velocity": 5000, "acceleration": 50000, "min_position": 0,
+                       "max_position": 100000, "stop_latency": 0.005},
+}
+
+
+class SimulatedMotor:
+    """
+    Motor moving with a trapezoidal velocity profile.
+    Commands are forward, backward (move towards the max or min position until stopped), stop
+    and move_to_position. The state is brought up to date from the clock whenever it is used.
+    """
+
+    def __init__(self, name, max_velocity, acceleration, min_position, max_position,
+                 stop_latency=0.0, clock=None, launch_position=None):
+        self.name = name
+        self.max_velocity = max_velocity
+        self.acceleration = acceleration
+        self.min_position = min_position
+        self.max_position = max_position
+        self.stop_latency = stop_latency
+        self.launch_position = max_position if launch_position is None else launch_position
+        self.clock = clock or AcceleratedClock(DEFAULT_TIME_FACTOR)
+        self.charger_state = False
+        # Optional PositionSampler that is started on every command
+        self.sampler = None
+
+        self._lock = threading.RLock()
+        self._position = float(min_position)
+        self._velocity = 0.0
+        self._target_position = None
+        self._stop_time = None
+        self._updated_time = self.clock.monotonic()
+
+    def forward(self):
+        self._set_target(self.max_position)
+
+    def backward(self):
+        self._set_target(self.min_position)
+
+    def move_to_position(self, position):
+        if not self.min_position <= position <= self.max_position:
+            raise ValueError(f"Position {position} is outside the limits of the {self.name} motor")
+        self._set_target(position)
+
+    def move_to_min_position(self):
+        self._set_target(self.min_position)
+
+    def move_to_max_position(self):
+        self._set_target(self.max_position)
+
+    def move_to_launch_position(self):
+        self._set_target(self.launch_position)
+
+    def stop(self):
+        with self._lock:
+            self._update()
+            if self._stop_time is None:
+                self._stop_time = self._updated_time + self.stop_latency
+        self._start_sampling()
+
+    def set_charger_state(self, state):
+        self.charger_state = state
+
+    def get_actual_position(self):
+        with self._lock:
+            self._update()
+            return int(round(self._position))
+
+    def get_actual_velocity(self):
+        with self._lock:
+            self._update()
+            return self._velocity
+
+    def is_moving(self):
+        with self._lock:
+            self._update()
+            return self._target_position is not None or self._velocity != 0
+
+    def wait_until_motor_stopped(self, timeout=DEFAULT_STOPPED_TIMEOUT):
+        """Waits until the motor has stopped, raises IOError if it has not stopped in time."""
+        if self.sampler is not None:
+            # The timeout is in motor time, the sampler waits in real time
+            real_timeout = timeout / getattr(self.clock, "time_factor", 1.0)
+            if not self.sampler.wait_until_stopped(real_timeout):
+                raise IOError(f"Timeout while waiting for the {self.name} motor to stop")
+            return
+
+        deadline = self.clock.monotonic() + timeout
+        while self.is_moving():
+            if self.clock.monotonic() > deadline:
+                raise IOError(f"Timeout while waiting for the {self.name} motor to stop")
+            self.clock.sleep(STOPPED_POLL_INTERVAL)
+
+    def _set_target(self, position):
+        with self._lock:
+            self._update()
+            self._target_position = float(position)
+            self._stop_time = None
+        self._start_sampling()
+
+    def _start_sampling(self):
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def _update(self):
+        """Integrates the motion from the last update until now."""
+        now = self.clock.monotonic()
+        while self._updated_time < now and (self._target_position is not None
+                                            or self._velocity != 0):
+            time_step = min(INTEGRATION_STEP, now - self._updated_time)
+            self._step(time_step)
+            self._updated_time += time_step
+        self._updated_time = now
+
+    def _step(self, time_step):
+        stopping = self._stop_time is not None and self._updated_time >= self._stop_time
+        if stopping or self._target_position is None:
+            desired_velocity = 0.0
+        else:
+            # Fastest velocity from which the motor can still brake before the target
+            distance = self._target_position - self._position
+            braking_velocity = math.sqrt(2 * self.acceleration * abs(distance))
+            desired_velocity = math.copysign(min(self.max_velocity, braking_velocity), distance)
+
+        max_change = self.acceleration * time_step
+        velocity_change = max(-max_change, min(max_change, desired_velocity - self._velocity))
+        self._velocity += velocity_change
+        self._position += self._velocity * time_step
+
+        if self._target_position is not None and not stopping:
+            remaining_distance = self._target_position - self._position
+            # Snap to the target when it is reached or passed at low speed
+            if abs(remaining_distance) < 1e-6 or (remaining_distance * self._velocity < 0
+                                                    and abs(self._velocity) <= max_change):
+                self._position = self._target_position
+                self._velocity = 0.0
+                self._target_position = None
+        elif abs(self._velocity) < 1e-9:
+            self._velocity = 0.0
+            self._target_position = None
+            self._stop_time = None
+
+        # The motor cannot move past its limits
+        if not self.min_position <= self._position <= self.max_position:
+            self._position = max(self.min_position, min(self.max_position, self._position))
+            self._velocity = 0.0
+            self._target_position = None
+            self._stop_time = None
+
+
+class PositionSampler:
+    """
+    Samples the position and velocity of a motor in a reader thread.
+    Sampling is started after a motor command and runs until the motor has settled. The samples
+    are kept in a ring buffer as (time, position, velocity). The stopped event is set at the first
+    sample where the motor is not moving, and the settled event after SETTLE_SAMPLES consecutive
+    samples without motion. A waiting thread therefore reacts within one sample period.
+    """
+
+    def __init__(self, motor, sample_rate=DEFAULT_SAMPLE_RATE, buffer_size=SAMPLE_BUFFER_SIZE,
+                 settle_samples=SETTLE_SAMPLES):
+        self.motor = motor
+        self.sample_period = 1 / sample_rate
+        self.settle_samples = settle_samples
+        self.samples = deque(maxlen=buffer_size)
+        self.stopped = threading.Event()
+        self.settled = threading.Event()
+        self.stopped.set()
+        self.settled.set()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Incremented on every start, samples taken before a start do not set the events
+        self._generation = 0
+
+    def start(self):
+        """Clears the stopped and settled events and samples until the motor has settled."""
+        with self._lock:
+            self._generation += 1
+            self.stopped.clear()
+            self.settled.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name=f"{self.motor.name} sampler")
+                self._thread.start()
+
+    def wait_until_stopped(self, timeout):
+        """Returns True if the motor stopped within timeout seconds."""
+        return self.stopped.wait(timeout)
+
+    def wait_until_settled(self, timeout):
+        """Returns True if the motor settled within timeout seconds."""
+        return self.settled.wait(timeout)
+
+    def _is_moving(self, position, velocity):
+        if hasattr(self.motor, "is_moving"):
+            return self.motor.is_moving()
+        if velocity is not None:
+            return velocity != 0
+        # Without velocity, the motor is moving if the position changed since the last sample
+        return not self.samples or self.samples[-1][1] != position
+
+    def _run(self):
+        still_samples = 0
+        while True:
+            with self._lock:
+                generation = self._generation
+            position = self.motor.get_actual_position()
+            velocity = self.motor.get_actual_velocity() \
+                if hasattr(self.motor, "get_actual_velocity") else None
+            moving = self._is_moving(position, velocity)
+            with self._lock:
+                self.samples.append((time.monotonic(), position, velocity))
+                if generation != self._generation:
+                    # Started again while sampling, the sample may be from before the command
+                    still_samples = 0
+                elif moving:
+                    still_samples = 0
+                    self.stopped.clear()
+                else:
+                    still_samples += 1
+                    self.stopped.set()
+                    if still_samples >= self.settle_samples:
+                        self.settled.set()
+                        self._thread = None
+                        return
+            time.sleep(self.sample_period)
+
+
+def use_simulated_motors(context):
+    """Checks if simulated motors have been selected in the userdata."""
+    return context.config.userdata.get(MOTORS_USERDATA) == "simulated"
+
+
+def is_motor_simulated(context, name):
+    """
+    Checks if the launcher motor is a simulated motor installed by install_simulated_motors.
+    Selecting simulated motors in the userdata is not enough, they are only installed when all
+    motors are made operational, and the real motors may have been put back since.
+    """
+    simulated_motor = getattr(context, "simulated_motors", {}).get(name)
+    motor = context.launcher.motors.get(name)
+    # pylint: disable=protected-access
+    return simulated_motor is not None and getattr(motor, "_mock_wraps", None) is simulated_motor
+
+
+def create_simulated_motor(name, clock):
+    """Creates a simulated motor with the limits of the named motor."""
+    return SimulatedMotor(name, clock=clock, **MOTOR_LIMITS[name])
+
+
+def install_simulated_motors(context):
+    """
+    Replaces the launcher motors with simulated motors.
+    The simulated motors are wrapped in mocks with the real motors as spec, so that the steps can
+    still assert on the motor calls. Motor functions that are not simulated are plain mocks.
+    The motors share the simulated clock of the test run if it is selected, otherwise they use an
+    accelerated clock.
+    """
+    sample_rate = float(context.config.userdata.get(SAMPLE_RATE_USERDATA, DEFAULT_SAMPLE_RATE))
+    clock = get_clock(context)
+    if not isinstance(clock, SimulatedClock):
+        time_factor = float(context.config.userdata.get(TIME_FACTOR_USERDATA,
+                                                        DEFAULT_TIME_FACTOR))
+        clock = AcceleratedClock(time_factor)
+    context.simulated_motors = {}
+    for name, motor in context.launcher.motors.items():
+        simulated_motor = create_simulated_motor(name, clock)
+        if name in SAMPLED_MOTORS and not isinstance(clock, SimulatedClock):
+            simulated_motor.sampler = PositionSampler(simulated_motor, sample_rate)
+        context.simulated_motors[name] = simulated_motor
+        motor_mock = Mock(motor, wraps=simulated_motor)
+        for function_name in dir(type(motor)):
+            if not function_name.startswith("_") and not hasattr(simulated_motor, function_name) \
+                    and callable(getattr(type(motor), function_name)):
+                setattr(motor_mock, function_name, Mock())
+        context.launcher.motors[name] = motor_mock
@@ -0,0 +1,156 @@
+"""
+Compiled index for dispatching step texts to the step implementations.
+
+behave tries every step pattern of a step type in registration order until one matches, for
+every step that is run. Many of the patterns in the steps are generic (e.g. "{motor} is stopped",
+"{command} is shown"), so most steps are parsed by a large part of the patterns. The index groups
+the patterns by the literal words they contain: a pattern is only tried for a step text that
+contains all of its literal words. The order of the remaining candidates is kept, so the result
+is the same as behave's, and the matching pattern is cached per distinct step text.
+
+The index is installed in the behave step registry from the before_all hook:
+    install_step_index(context)
+which also reports the step texts in the features that match more than one pattern, since
+those depend on the registration order of the steps.
+"""
+import re
+import sys
+
+from behave.step_registry import registry as step_registry
+
+FIELD_PATTERN = re.compile(r"\{[^{}]*\}")
+STEP_TYPES = ["given", "when", "then", "step"]
+
+
+def literal_words(pattern):
+    """
+    Returns the words of a parse pattern that every matching text contains as whole words.
+    Words attached to a field, like "s" in "{motor}s", are left out.
+    """
+    words = set()
+    fragments = FIELD_PATTERN.split(pattern)
+    for number, fragment in enumerate(fragments):
+        fragment_words = fragment.split()
+        if number > 0 and fragment_words and not fragment[0].isspace():
+            fragment_words.pop(0)
+        if number < len(fragments) - 1 and fragment_words and not fragment[-1].isspace():
+            fragment_words.pop()
+        words.update(word.lower() for word in fragment_words)
+    return words
+
+
+class StepDispatchIndex:
+    """
+    Finds the candidate patterns for a step text.
+    :param patterns: Patterns in the order they are tried
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._required_word_counts = []
+        self._word_index = {}
+        # Patterns consisting only of fields are candidates for every text
+        self._wildcards = []
+        for number, pattern in enumerate(self.patterns):
+            words = literal_words(pattern)
+            self._required_word_counts.append(len(words))
+            if not words:
+                self._wildcards.append(number)
+            for word in words:
+                self._word_index.setdefault(word, []).append(number)
+
+    def candidates(self, text):
+        """Returns the numbers of the patterns that may match the text, in order."""
+        found_word_counts = {}
+        for word in set(text.lower().split()):
+            for number in self._word_index.get(word, ()):
+                found_word_counts[number] = found_word_counts.get(number, 0) + 1
+        candidates = [number for number, count in found_word_counts.items()
+                      if count == self._required_word_counts[number]]
+        return sorted(candidates + self._wildcards)
+
+
+class CompiledStepRegistry:
+    """
+    Matches steps with the step definitions of a behave step registry through a
+    StepDispatchIndex per step type, with a cache of the matching definition per step text.
+    """
+
+    def __init__(self, registry=step_registry):
+        self.registry = registry
+        self._indexes = {}
+        self._match_cache = {}
+        self._step_count = None
+
+    def _step_definitions(self, step_type):
+        definitions = self.registry.steps[step_type]
+        if step_type != "step":
+            definitions = definitions + self.registry.steps["step"]
+        return definitions
+
+    def _refresh(self):
+        """Rebuilds the indexes if steps have been registered since they were built."""
+        step_count = sum(len(definitions) for definitions in self.registry.steps.values())
+        if step_count != self._step_count:
+            self._indexes = {step_type: StepDispatchIndex(
+                definition.pattern for definition in self._step_definitions(step_type))
+                             for step_type in STEP_TYPES}
+            self._match_cache = {}
+            self._step_count = step_count
+
+    def find_step_definition(self, step_type, text):
+        """Returns the first step definition matching the text, like behave, or None."""
+        self._refresh()
+        key = (step_type, text)
+        if key not in self._match_cache:
+            definitions = self._step_definitions(step_type)
+            self._match_cache[key] = next(
+                (definitions[number] for number in self._indexes[step_type].candidates(text)
+                 if definitions[number].match(text)), None)
+        return self._match_cache[key]
+
+    def find_match(self, step):
+        """Replacement of StepRegistry.find_match."""
+        step_definition = self.find_step_definition(step.step_type, step.name)
+        if step_definition is None:
+            return None
+        return step_definition.match(step.name)
+
+    def find_ambiguous_steps(self, features):
+        """
+        Returns the step texts that match more than one step definition.
+        :return: Dict of (step_type, step text) to the patterns matching it, in order
+        """
+        self._refresh()
+        ambiguous_steps = {}
+        for feature in features:
+            for step_type, text in _feature_steps(feature):
+                definitions = self._step_definitions(step_type)
+                patterns = [definitions[number].pattern
+                            for number in self._indexes[step_type].candidates(text)
+                            if definitions[number].match(text)]
+                if len(patterns) > 1:
+                    ambiguous_steps[(step_type, text)] = patterns
+        return ambiguous_steps
+
+
+def _feature_steps(feature):
+    """
+    Yields (step_type, step text) of all steps of a feature, including the scenarios in rules and
+    all outline examples.
+    """
+    for scenario in feature.walk_scenarios():
+        for step in scenario.all_steps:
+            yield step.step_type, step.name
+
+
+def install_step_index(context, registry=step_registry, file=sys.stderr):
+    """Makes behave match the steps through a CompiledStepRegistry and reports ambiguous steps."""
+    compiled_registry = CompiledStepRegistry(registry)
+    registry.find_match = compiled_registry.find_match
+    context.step_dispatch = compiled_registry
+
+    features = getattr(getattr(context, "_runner", None), "features", None) or []
+    for (step_type, text), patterns in compiled_registry.find_ambiguous_steps(features).items():
+        print(f"Ambiguous {step_type} step '{text}' matches: "
+              + ", ".join(f"'{pattern}'" for pattern in patterns), file=file)
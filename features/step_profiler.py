@@ -0,0 +1,133 @@
+"""
+Per-step latency profile of a test run.
+
+Records the wall time of every step and of every wait in the step, as recorded by
+adaptive_wait. For steps with a time budget ("... within 0.7 seconds") the time it took to
+satisfy the assertion is compared with the budget, so that steps getting close to their budget
+are found before they fail. Steps executed from other steps with execute_steps are profiled as
+steps of their own.
+
+Called from the behave hooks in the environment:
+    before_all: start_step_profile(context)
+    before_step: profile_before_step(context, step)
+    after_step: profile_after_step(context, step)
+    after_all: write_step_profile(context)
+The profile is written as json and csv to the base name given with "-D step_profile=<name>".
+Nothing is recorded if step_profile is not set.
+
+The running steps and their waits are tracked by adaptive_wait: profile_before_step and
+profile_after_step call its enter_step and exit_step, also when nothing is profiled, so the
+environment does not call those separately.
+"""
+import csv
+import json
+import re
+import time
+
+from features.adaptive_wait import RUNNING_STEPS, enter_step, exit_step
+
+STEP_PROFILE_USERDATA = "step_profile"
+BUDGET_PATTERN = re.compile(r"within (\d+(?:\.\d+)?) seconds?")
+SUMMARY_SIZE = 10
+CSV_FIELDS = ["feature", "scenario", "step", "location", "depth", "status", "duration",
+              "wait_count", "wait_time", "budget", "satisfied_time", "margin"]
+
+
+class StepProfile:
+    """Timings of the executed steps, with the waits of each step"""
+
+    def __init__(self):
+        self.steps = []
+
+    def add_step(self, context, step, running_step):
+        """
+        Adds a finished step.
+        :param context: behave context of the step
+        :param step: The step
+        :param running_step: The step as returned by adaptive_wait.exit_step
+        """
+        budget = BUDGET_PATTERN.search(step.name)
+        scenario = getattr(context, "scenario", None)
+        feature = getattr(context, "feature", None)
+        record = {
+            "feature": feature.name if feature else "",
+            "scenario": scenario.name if scenario else "",
+            "step": running_step["name"],
+            "location": str(step.location),
+            # The step has already been removed from the running steps
+            "depth": len(RUNNING_STEPS),
+            "budget": float(budget.group(1)) if budget else None,
+            "waits": running_step["waits"],
+        }
+        record["duration"] = time.perf_counter() - running_step["start_time"]
+        record["status"] = step.status.name if hasattr(step.status, "name") else str(step.status)
+        wait_times = [wait_time for _, wait_time in record["waits"]]
+        record["wait_count"] = len(wait_times)
+        record["wait_time"] = sum(wait_times)
+        record["satisfied_time"] = None
+        record["margin"] = None
+        if record["budget"] is not None and record["status"] == "passed":
+            # The assertion is satisfied when the slowest condition in the step is satisfied
+            record["satisfied_time"] = max(wait_times, default=record["duration"])
+            record["margin"] = record["budget"] - record["satisfied_time"]
+        self.steps.append(record)
+
+    def get_summary(self, size=SUMMARY_SIZE):
+        """
+        Returns the slowest steps and the budgeted steps with the smallest margin.
+        Nested steps are left out of the slowest steps, their time is part of the outer step.
+        """
+        top_level_steps = [step for step in self.steps if step["depth"] == 0]
+        budgeted_steps = [step for step in self.steps if step["margin"] is not None]
+        return {
+            "step_count": len(self.steps),
+            "total_duration": sum(step["duration"] for step in top_level_steps),
+            "slowest_steps": [_summary_entry(step) for step in
+                              sorted(top_level_steps, key=lambda step: -step["duration"])[:size]],
+            "closest_to_budget": [_summary_entry(step) for step in
+                                  sorted(budgeted_steps, key=lambda step: step["margin"])[:size]],
+        }
+
+    def write(self, base_name):
+        """Writes the profile to <base_name>.json and the steps to <base_name>.csv."""
+        with open(f"{base_name}.json", "w", encoding="utf-8") as file:
+            json.dump({"summary": self.get_summary(), "steps": self.steps}, file, indent=2)
+        with open(f"{base_name}.csv", "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(self.steps)
+
+
+def _summary_entry(step):
+    return {key: step[key] for key in ["step", "location", "duration", "budget",
+                                       "satisfied_time", "margin"]}
+
+
+def start_step_profile(context):
+    """Starts profiling if a step_profile base name is given in the userdata."""
+    if context.config.userdata.get(STEP_PROFILE_USERDATA):
+        context.step_profile = StepProfile()
+
+
+def profile_before_step(context, step):
+    """Marks the start of the step for both the profile and the per-step wait times."""
+    enter_step(f"{step.keyword} {step.name}")
+
+
+def profile_after_step(context, step):
+    """Marks the end of the step and adds it to the profile, if profiling."""
+    running_step = exit_step()
+    profile = getattr(context, "step_profile", None)
+    if profile is not None and running_step is not None:
+        profile.add_step(context, step, running_step)
+
+
+def write_step_profile(context):
+    """Writes the profile and prints the steps closest to their budget."""
+    profile = getattr(context, "step_profile", None)
+    if profile is None:
+        return
+    profile.write(context.config.userdata[STEP_PROFILE_USERDATA])
+    for step in profile.get_summary()["closest_to_budget"]:
+        print(f"{step['margin']:7.3f} s margin of {step['budget']} s: {step['step']} "
+              f"({step['location']})")
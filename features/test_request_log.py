@@ -0,0 +1,150 @@
+"""
+Tests of the request log, with a browser that calls the interceptors like selenium-wire 5 does
+"""
+import json
+import threading
+import uuid
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from features.request_body import decode_request_body
+from features.request_log import RequestLog
+
+MOTOR_CONTROL_URL = "http://localhost:5000/app_motor_control"
+MEASUREMENTS_URL = "http://localhost:5000/measurements"
+
+
+class FakeRequest:
+    def __init__(self, url, body=b"", method="POST"):
+        self.id = None
+        self.method = method
+        self.url = url
+        self.path = url[url.index("/", len("http://")):]
+        self.body = body
+        self.headers = {"Content-Type": "application/json"}
+        self.response = None
+
+    def copy(self):
+        return FakeRequest(self.url, self.body, self.method)
+
+
+class FakeSeleniumWireBrowser:
+    """
+    Calls the request interceptor before the request is stored and gets its id, and passes a
+    new request object without id to the response interceptor, like selenium-wire 5.
+    """
+
+    def __init__(self):
+        self.request_interceptor = None
+        self.response_interceptor = None
+        self.requests = []
+
+    def capture(self, url, body=None, method="POST"):
+        request = FakeRequest(url, json.dumps(body).encode("utf-8") if body else b"", method)
+        if self.request_interceptor is not None:
+            self.request_interceptor(request)
+        stored_request = request.copy()
+        stored_request.id = str(uuid.uuid4())
+        self.requests.append(stored_request)
+        return stored_request
+
+    def respond(self, stored_request, status_code=200):
+        request = stored_request.copy()
+        request.response = status_code
+        if self.response_interceptor is not None:
+            self.response_interceptor(request, status_code)
+        stored_request.response = status_code
+
+
+def motor_command(command):
+    return {"motor": "pitch", "command": command}
+
+
+def commands(requests):
+    return [decode_request_body(request)["command"] for request in requests]
+
+
+@pytest.fixture(name="browser")
+def fixture_browser():
+    return FakeSeleniumWireBrowser()
+
+
+def test_requests_are_found_in_capture_order(browser):
+    request_log = RequestLog(browser)
+    cursor = request_log.position()
+    up_request = browser.capture(MOTOR_CONTROL_URL, motor_command("up"))
+    stop_request = browser.capture(MOTOR_CONTROL_URL, motor_command("stop"))
+    # The stop response arrives before the response to the motor command
+    browser.respond(stop_request)
+    assert commands(request_log.find(MOTOR_CONTROL_URL, cursor)) == ["stop"]
+    assert commands(request_log.find_pending(MOTOR_CONTROL_URL)) == ["up"]
+    browser.respond(up_request)
+    assert commands(request_log.find(MOTOR_CONTROL_URL, cursor)) == ["up", "stop"]
+    assert not request_log.find_pending(MOTOR_CONTROL_URL)
+
+
+def test_find_from_cursor(browser):
+    request_log = RequestLog(browser)
+    browser.respond(browser.capture(MOTOR_CONTROL_URL, motor_command("up")))
+    browser.respond(browser.capture(MEASUREMENTS_URL, method="GET"))
+    cursor = request_log.position()
+    browser.respond(browser.capture(MOTOR_CONTROL_URL, motor_command("down")))
+    assert commands(request_log.find(MOTOR_CONTROL_URL)) == ["up", "down"]
+    assert commands(request_log.find(MOTOR_CONTROL_URL, cursor)) == ["down"]
+    assert len(request_log.find(MEASUREMENTS_URL)) == 1
+
+
+def test_equal_requests_are_all_logged(browser):
+    request_log = RequestLog(browser)
+    first_request = browser.capture(MOTOR_CONTROL_URL, motor_command("stop"))
+    second_request = browser.capture(MOTOR_CONTROL_URL, motor_command("stop"))
+    browser.respond(second_request)
+    browser.respond(first_request)
+    assert commands(request_log.find(MOTOR_CONTROL_URL)) == ["stop", "stop"]
+
+
+def test_wait_for_next_waits_for_the_first_captured_request(browser):
+    request_log = RequestLog(browser)
+    cursor = request_log.position()
+    up_request = browser.capture(MOTOR_CONTROL_URL, motor_command("up"))
+    stop_request = browser.capture(MOTOR_CONTROL_URL, motor_command("stop"))
+    browser.respond(stop_request)
+    timer = threading.Timer(0.05, browser.respond, [up_request])
+    timer.start()
+    request = request_log.wait_for_next(MOTOR_CONTROL_URL, cursor, timeout=2)
+    timer.join()
+    assert commands([request]) == ["up"]
+
+
+def test_wait_for_next_times_out(browser):
+    request_log = RequestLog(browser)
+    browser.respond(browser.capture(MOTOR_CONTROL_URL, motor_command("up")))
+    with pytest.raises(TimeoutException):
+        request_log.wait_for_next(MOTOR_CONTROL_URL, request_log.position(), timeout=0.05)
+
+
+def test_synchronize_with_captured_requests(browser):
+    # Requests captured before the log was created
+    browser.respond(browser.capture(MOTOR_CONTROL_URL, motor_command("up")))
+    pending_request = browser.capture(MOTOR_CONTROL_URL, motor_command("stop"))
+    request_log = RequestLog(browser)
+    request_log.synchronize()
+    assert commands(request_log.find(MOTOR_CONTROL_URL)) == ["up"]
+    browser.respond(pending_request)
+    assert commands(request_log.find(MOTOR_CONTROL_URL)) == ["up", "stop"]
+
+    # The captured requests are cleared between scenarios
+    browser.requests = []
+    request_log.synchronize()
+    assert not request_log.find(MOTOR_CONTROL_URL)
+    assert request_log.position() == 0
+
+
+def test_existing_interceptors_are_called(browser):
+    intercepted = []
+    browser.request_interceptor = lambda request: intercepted.append("request")
+    browser.response_interceptor = lambda request, response: intercepted.append("response")
+    RequestLog(browser)
+    browser.respond(browser.capture(MOTOR_CONTROL_URL, motor_command("up")))
+    assert intercepted == ["request", "response"]
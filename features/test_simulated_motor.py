@@ -0,0 +1,155 @@
+"""
+Tests of the kinematic motor simulation
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from features.clock import SimulatedClock, get_clock
+from features.simulated_motor import SimulatedMotor, PositionSampler, create_simulated_motor, \
+    install_simulated_motors
+
+
+def create_motor(clock, stop_latency=0.0):
+    return SimulatedMotor("pitch", max_velocity=100, acceleration=400, min_position=0,
+                          max_position=1000, stop_latency=stop_latency, clock=clock)
+
+
+def test_move_to_position_reaches_target():
+    clock = SimulatedClock()
+    motor = create_motor(clock)
+    motor.move_to_position(300)
+    # Accelerating to 100 units/s takes 0.25 s and 12.5 units, the same for braking
+    clock.advance(1.0)
+    assert motor.is_moving()
+    assert 0 < motor.get_actual_position() < 300
+    clock.advance(2.5)
+    assert not motor.is_moving()
+    assert motor.get_actual_position() == 300
+
+
+def test_move_to_position_outside_limits():
+    motor = create_motor(SimulatedClock())
+    with pytest.raises(ValueError):
+        motor.move_to_position(1001)
+
+
+def test_velocity_is_limited():
+    clock = SimulatedClock()
+    motor = create_motor(clock)
+    motor.forward()
+    clock.advance(1.0)
+    assert motor.get_actual_velocity() == pytest.approx(100)
+
+
+def test_stop_latency():
+    clock = SimulatedClock()
+    motor = create_motor(clock, stop_latency=0.5)
+    motor.forward()
+    clock.advance(1.0)
+    motor.stop()
+    stop_position = motor.get_actual_position()
+    # The motor keeps its velocity until the stop latency has passed
+    clock.advance(0.5)
+    assert motor.get_actual_velocity() == pytest.approx(100)
+    assert motor.get_actual_position() == pytest.approx(stop_position + 50, abs=1)
+    # and then brakes in 0.25 s
+    clock.advance(0.3)
+    assert not motor.is_moving()
+    assert motor.get_actual_position() == pytest.approx(stop_position + 62.5, abs=1)
+
+
+def test_stopped_motor_is_not_restarted():
+    clock = SimulatedClock()
+    motor = create_motor(clock)
+    motor.backward()
+    clock.advance(1.0)
+    assert not motor.is_moving()
+    assert motor.get_actual_position() == 0
+
+
+def test_position_is_clamped_at_limits():
+    clock = SimulatedClock()
+    motor = create_motor(clock)
+    motor.forward()
+    clock.advance(20.0)
+    assert not motor.is_moving()
+    assert motor.get_actual_position() == 1000
+
+
+def test_move_to_launch_position():
+    clock = SimulatedClock()
+    motor = SimulatedMotor("drone_position", max_velocity=100, acceleration=400, min_position=0,
+                           max_position=1000, clock=clock, launch_position=500)
+    motor.move_to_launch_position()
+    clock.advance(10.0)
+    assert motor.get_actual_position() == 500
+
+
+def test_wait_until_motor_stopped_times_out():
+    clock = SimulatedClock()
+    motor = create_motor(clock)
+    motor.forward()
+    with pytest.raises(IOError):
+        motor.wait_until_motor_stopped(timeout=1.0)
+
+
+def test_sampler_signals_stop():
+    motor = create_simulated_motor("drone_position", None)
+    motor.sampler = PositionSampler(motor, sample_rate=1000)
+    for position in [1000, 3000, 2000]:
+        motor.move_to_position(position)
+        motor.wait_until_motor_stopped(timeout=10)
+        assert not motor.is_moving()
+        assert motor.get_actual_position() == position
+    assert motor.sampler.wait_until_settled(1.0)
+
+
+class FakeMotor:
+    """Motor interface that the simulated motors are specced from"""
+
+    def move_to_position(self, position):
+        pass
+
+    def wait_until_motor_stopped(self, timeout=30):
+        pass
+
+    def get_actual_position(self):
+        pass
+
+    def get_motor_error(self):
+        pass
+
+
+def create_context(userdata):
+    motors = {"pitch": FakeMotor(), "drone_position": FakeMotor()}
+    return SimpleNamespace(config=SimpleNamespace(userdata=userdata),
+                           launcher=SimpleNamespace(motors=motors), browser=None)
+
+
+def test_installed_motors_use_the_simulated_clock():
+    context = create_context({"motors": "simulated", "clock": "simulated"})
+    install_simulated_motors(context)
+    clock = get_clock(context)
+    assert all(motor.clock is clock for motor in context.simulated_motors.values())
+    assert context.simulated_motors["drone_position"].sampler is None
+
+    drone_position = context.launcher.motors["drone_position"]
+    start_time = time.monotonic()
+    drone_position.move_to_position(50000)
+    drone_position.wait_until_motor_stopped()
+    # Moving takes more than 10 s in simulated time, without any real waiting
+    assert clock.monotonic() > 10
+    assert time.monotonic() - start_time < 5
+    assert drone_position.get_actual_position() == 50000
+    drone_position.move_to_position.assert_called_once_with(50000)
+    # Functions that are not simulated are plain mocks
+    drone_position.get_motor_error.assert_not_called()
+
+
+def test_installed_motors_use_an_accelerated_clock_by_default():
+    context = create_context({"motors": "simulated", "motor_time_factor": "20"})
+    install_simulated_motors(context)
+    assert context.simulated_motors["pitch"].clock.time_factor == 20
+    assert context.simulated_motors["drone_position"].sampler is not None
@@ -0,0 +1,66 @@
+"""
+Tests of the step profiler and the per-step wait times it shares with adaptive_wait
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from features.adaptive_wait import RUNNING_STEPS, STEP_LABEL_PREFIX, WAIT_TIMES, record_wait_time
+from features.step_profiler import profile_after_step, profile_before_step, start_step_profile
+
+
+def create_step(name, keyword="Then", status="passed"):
+    return SimpleNamespace(keyword=keyword, name=name, location=f"test.feature:{len(name)}",
+                           status=status)
+
+
+def create_context(step_profile="profile"):
+    return SimpleNamespace(config=SimpleNamespace(userdata={"step_profile": step_profile}),
+                           feature=SimpleNamespace(name="Feature"),
+                           scenario=SimpleNamespace(name="Scenario"))
+
+
+@pytest.fixture(autouse=True)
+def clear_wait_times():
+    yield
+    WAIT_TIMES.clear()
+    RUNNING_STEPS.clear()
+
+
+def test_one_pair_of_hooks_drives_profile_and_wait_times():
+    context = create_context()
+    start_step_profile(context)
+    outer_step = create_step("status is shown within 0.7 seconds")
+    inner_step = create_step("user presses stop", keyword="When")
+
+    profile_before_step(context, outer_step)
+    record_wait_time("status", 0.1)
+    profile_before_step(context, inner_step)
+    record_wait_time("stop button", 0.2)
+    profile_after_step(context, inner_step)
+    record_wait_time("status", 0.3)
+    profile_after_step(context, outer_step)
+
+    assert not RUNNING_STEPS
+    inner_record, outer_record = context.step_profile.steps
+    assert inner_record["step"] == "When user presses stop"
+    assert inner_record["depth"] == 1
+    assert inner_record["wait_count"] == 1
+    assert outer_record["depth"] == 0
+    assert outer_record["waits"] == [("status", 0.1), ("status", 0.3)]
+    assert outer_record["satisfied_time"] == pytest.approx(0.3)
+    assert outer_record["margin"] == pytest.approx(0.4)
+    assert WAIT_TIMES[STEP_LABEL_PREFIX + "Then status is shown within 0.7 seconds"] == [0.1, 0.3]
+    assert WAIT_TIMES[STEP_LABEL_PREFIX + "When user presses stop"] == [0.2]
+
+
+def test_wait_times_per_step_without_profiling():
+    context = create_context(step_profile=None)
+    start_step_profile(context)
+    step = create_step("user presses stop", keyword="When")
+    profile_before_step(context, step)
+    record_wait_time("stop button", 0.2)
+    profile_after_step(context, step)
+    assert not hasattr(context, "step_profile")
+    assert not RUNNING_STEPS
+    assert WAIT_TIMES[STEP_LABEL_PREFIX + "When user presses stop"] == [0.2]
@@ -0,0 +1,148 @@
+"""
+Tests of the record and replay of the EPOS and Roboclaw communication
+"""
+import ctypes
+
+import pytest
+
+from features.transport_recording import TransportRecorder, RecordingLibrary, RecordingSerial, \
+    ReplayLibrary, ReplaySerial, ReplayMismatchError, read_transport_log, record_roboclaw_open, \
+    replay_roboclaw_open, CALL, WRITE, READ, OPEN, EPOS_CHANNEL, ROBOCLAW_CHANNEL
+
+
+class FakeEposLibrary:
+    """Library with a call that takes arguments by value and returns an error code by reference"""
+
+    @staticmethod
+    def VCS_MoveToPosition(handle, node_id, position, error_code):  # pylint: disable=invalid-name
+        error_code._obj.value = 0 if position >= 0 else 34
+        return 1 if position >= 0 else 0
+
+
+class FakeSerial:
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        self.written.append(data)
+        return len(data)
+
+    @staticmethod
+    def read(size=1):
+        return b"\x2a" * size
+
+
+class FakeRoboclaw:
+    def __init__(self):
+        self.comport = "/dev/ttyACM0"
+        self._port = None
+
+    def Open(self):  # pylint: disable=invalid-name
+        if not self.comport:
+            raise IOError("Could not open port")
+        self._port = FakeSerial()
+        return 1
+
+
+def move_to_position(library, position):
+    error_code = ctypes.c_uint(99)
+    return_value = library.VCS_MoveToPosition(1, ctypes.c_uint(2), position,
+                                              ctypes.byref(error_code))
+    return return_value, error_code.value
+
+
+@pytest.fixture(name="log_file")
+def fixture_log_file(tmp_path):
+    """Log file with an EPOS call, an opened Roboclaw session and a failed Open"""
+    log_file = str(tmp_path / "transport.log")
+    recorder = TransportRecorder(log_file)
+    library = RecordingLibrary(FakeEposLibrary(), recorder)
+    roboclaw = FakeRoboclaw()
+    record_roboclaw_open(roboclaw, recorder)
+
+    assert move_to_position(library, 1000) == (1, 0)
+    assert move_to_position(library, -1) == (0, 34)
+    roboclaw.Open()
+    roboclaw._port.write(b"\x80\x15")  # pylint: disable=protected-access
+    roboclaw._port.read(2)  # pylint: disable=protected-access
+    roboclaw.comport = ""
+    with pytest.raises(IOError):
+        roboclaw.Open()
+    recorder.close()
+    return log_file
+
+
+def test_log_round_trip(log_file):
+    records = read_transport_log(log_file)
+    assert [(record.channel, record.kind, record.name) for record in records] == [
+        (EPOS_CHANNEL, CALL, "VCS_MoveToPosition"),
+        (EPOS_CHANNEL, CALL, "VCS_MoveToPosition"),
+        (ROBOCLAW_CHANNEL, OPEN, "Open"),
+        (ROBOCLAW_CHANNEL, WRITE, "write"),
+        (ROBOCLAW_CHANNEL, READ, "read"),
+        (ROBOCLAW_CHANNEL, OPEN, "Open"),
+    ]
+    assert records[3].payload == b"\x80\x15"
+    assert records[4].payload == b"\x2a\x2a"
+    assert [record.time for record in records] == sorted(record.time for record in records)
+
+
+def test_not_a_transport_log(tmp_path):
+    log_file = tmp_path / "other.log"
+    log_file.write_bytes(b"something else")
+    with pytest.raises(ValueError):
+        read_transport_log(str(log_file))
+
+
+def test_replay_epos_calls(log_file):
+    library = ReplayLibrary(read_transport_log(log_file))
+    assert move_to_position(library, 1000) == (1, 0)
+    assert move_to_position(library, -1) == (0, 34)
+
+
+def test_replay_epos_argument_mismatch(log_file):
+    library = ReplayLibrary(read_transport_log(log_file))
+    with pytest.raises(ReplayMismatchError):
+        move_to_position(library, 500)
+
+
+def test_replay_epos_function_mismatch(log_file):
+    library = ReplayLibrary(read_transport_log(log_file))
+    with pytest.raises(ReplayMismatchError):
+        library.VCS_GetPositionIs(1, 2)
+
+
+def test_replay_beyond_recording(log_file):
+    library = ReplayLibrary(read_transport_log(log_file))
+    move_to_position(library, 1000)
+    move_to_position(library, -1)
+    with pytest.raises(ReplayMismatchError):
+        move_to_position(library, 1000)
+
+
+def test_replay_roboclaw_session(log_file):
+    roboclaw = FakeRoboclaw()
+    port = ReplaySerial(read_transport_log(log_file))
+    replay_roboclaw_open(roboclaw, port)
+
+    assert roboclaw.Open() == 1
+    assert roboclaw._port.write(b"\x80\x15") == 2  # pylint: disable=protected-access
+    assert roboclaw._port.read(2) == b"\x2a\x2a"  # pylint: disable=protected-access
+    with pytest.raises(IOError):
+        roboclaw.Open()
+
+
+def test_replay_roboclaw_write_mismatch(log_file):
+    port = ReplaySerial(read_transport_log(log_file))
+    port.open()
+    with pytest.raises(ReplayMismatchError):
+        port.write(b"\x80\x16")
+
+
+def test_recording_serial_forwards_traffic(tmp_path):
+    recorder = TransportRecorder(str(tmp_path / "transport.log"))
+    port = FakeSerial()
+    recording_port = RecordingSerial(port, recorder)
+    recording_port.write(b"\x01")
+    recorder.close()
+    assert port.written == [b"\x01"]
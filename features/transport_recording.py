@@ -0,0 +1,339 @@
+"""
+Record and replay of the low level motor communication, the EPOS CDLL calls and the Roboclaw
+serial traffic.
+
+A recording wraps the real EPOS library and Roboclaw serial port and writes every exchange to a
+compact binary log. A replay stands in for the library and serial port and answers from the log
+without any hardware, at full speed or with the original timing between the messages.
+
+Log format: the MAGIC header followed by records of
+    channel (uint8), kind (uint8), time since start (float64), name length (uint16), name,
+    payload length (uint32), payload
+For EPOS calls the payload is the number of integer arguments passed by value, their values, the
+return value and the values of the arguments passed by reference (int64 each). The arguments
+passed by value are compared when replaying, so a changed command, e.g. another target position,
+is reported as a mismatch. For serial writes and reads the payload is the raw bytes. Every Open of
+the Roboclaw communication is recorded as well, with 1 and the return value as payload when it
+succeeded and 0 and the error message when it failed, since it replaces the serial port.
+
+The mode is selected with behave userdata, "-D transport=record|replay|replay_timed" and
+"-D transport_log=<file>", and applied with install_transport once the EPOS and Roboclaw
+interfaces have been created.
+"""
+import atexit
+import ctypes
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+MAGIC = b"SSRSTRL2"
+RECORD_HEADER = struct.Struct("<BBdH")
+PAYLOAD_LENGTH = struct.Struct("<I")
+CALL_VALUE = struct.Struct("<q")
+
+EPOS_CHANNEL = 0
+ROBOCLAW_CHANNEL = 1
+
+CALL = 0
+WRITE = 1
+READ = 2
+OPEN = 3
+
+OPEN_SUCCEEDED = b"\x01"
+OPEN_FAILED = b"\x00"
+
+TRANSPORT_USERDATA = "transport"
+TRANSPORT_LOG_USERDATA = "transport_log"
+DEFAULT_TRANSPORT_LOG = "transport.log"
+
+TransportRecord = namedtuple("TransportRecord", ["channel", "kind", "time", "name", "payload"])
+
+
+class ReplayMismatchError(IOError):
+    """The replayed communication differs from the recording"""
+
+
+class TransportRecorder:
+    """Writes transport records to a binary log file"""
+
+    def __init__(self, file_name):
+        self._file = open(file_name, "wb")  # pylint: disable=consider-using-with
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+
+    def record(self, channel, kind, name, payload):
+        encoded_name = name.encode("utf-8")
+        with self._lock:
+            self._file.write(RECORD_HEADER.pack(channel, kind, time.monotonic() - self._start_time,
+                                                len(encoded_name)))
+            self._file.write(encoded_name)
+            self._file.write(PAYLOAD_LENGTH.pack(len(payload)))
+            self._file.write(payload)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_transport_log(file_name):
+    """Returns the records of a binary log file as a list of TransportRecord."""
+    with open(file_name, "rb") as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{file_name} is not a transport log")
+
+    records = []
+    offset = len(MAGIC)
+    while offset < len(data):
+        channel, kind, record_time, name_length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        name = data[offset:offset + name_length].decode("utf-8")
+        offset += name_length
+        (payload_length,) = PAYLOAD_LENGTH.unpack_from(data, offset)
+        offset += PAYLOAD_LENGTH.size
+        payload = data[offset:offset + payload_length]
+        offset += payload_length
+        records.append(TransportRecord(channel, kind, record_time, name, payload))
+    return records
+
+
+def encode_call(input_values, return_value, output_values):
+    values = [len(input_values)] + input_values + [return_value] + output_values
+    return b"".join(CALL_VALUE.pack(int(value)) for value in values)
+
+
+def decode_call(payload):
+    """Returns the input values, the return value and the output values of an EPOS call."""
+    values = [value for (value,) in CALL_VALUE.iter_unpack(payload)]
+    input_count = values[0]
+    return values[1:input_count + 1], values[input_count + 1], values[input_count + 2:]
+
+
+def _input_values(args):
+    """Returns the values of the integer arguments passed by value, including ctypes integers."""
+    values = []
+    for arg in args:
+        if isinstance(arg, ctypes._SimpleCData):  # pylint: disable=protected-access
+            arg = arg.value
+        if isinstance(arg, int):
+            values.append(arg)
+    return values
+
+
+def _output_objects(args):
+    """Returns the ctypes objects of the arguments passed by reference (byref or pointer)."""
+    objects = []
+    for arg in args:
+        if isinstance(arg, ctypes._Pointer):  # pylint: disable=protected-access
+            objects.append(arg.contents)
+        elif type(arg).__name__ == "CArgObject":
+            objects.append(arg._obj)  # pylint: disable=protected-access
+    return [obj for obj in objects if isinstance(getattr(obj, "value", None), int)]
+
+
+class RecordingLibrary:
+    """Stand-in for a CDLL that forwards all calls to the library and records them"""
+
+    def __init__(self, library, recorder, channel=EPOS_CHANNEL):
+        self._library = library
+        self._recorder = recorder
+        self._channel = channel
+
+    def __getattr__(self, name):
+        function = getattr(self._library, name)
+        if not callable(function):
+            return function
+
+        def _record_call(*args):
+            return_value = function(*args)
+            output_values = [obj.value for obj in _output_objects(args)]
+            self._recorder.record(self._channel, CALL, name,
+                                  encode_call(_input_values(args), return_value or 0,
+                                              output_values))
+            return return_value
+
+        return _record_call
+
+
+class RecordingSerial:
+    """Stand-in for a serial port that forwards all traffic to the port and records it"""
+
+    def __init__(self, port, recorder, channel=ROBOCLAW_CHANNEL):
+        self._port = port
+        self._recorder = recorder
+        self._channel = channel
+
+    def write(self, data):
+        self._recorder.record(self._channel, WRITE, "write", bytes(data))
+        return self._port.write(data)
+
+    def read(self, size=1):
+        data = self._port.read(size)
+        self._recorder.record(self._channel, READ, "read", bytes(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._port, name)
+
+
+class Replay:
+    """
+    Replays the records of one channel in order.
+    With timed=True the original time between the records is kept, otherwise the records are
+    replayed as fast as they are requested.
+    """
+
+    def __init__(self, records, channel, timed=False):
+        self._records = deque(record for record in records if record.channel == channel)
+        self._timed = timed
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+
+    def next(self, kind, name):
+        """Returns the next record, which must have the given kind and name."""
+        with self._lock:
+            if not self._records:
+                raise ReplayMismatchError(f"Replay has no more records, expected {name}")
+            record = self._records.popleft()
+        if record.kind != kind or record.name != name:
+            raise ReplayMismatchError(f"Replay expected {record.name}, got {name}")
+        if self._timed:
+            delay = record.time - (time.monotonic() - self._start_time)
+            if delay > 0:
+                time.sleep(delay)
+        return record
+
+    def remaining(self):
+        with self._lock:
+            return len(self._records)
+
+
+class ReplayLibrary:
+    """Stand-in for a CDLL that answers the calls from a recording"""
+
+    def __init__(self, records, timed=False, channel=EPOS_CHANNEL):
+        self._replay = Replay(records, channel, timed)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def _replay_call(*args):
+            input_values, return_value, output_values = decode_call(
+                self._replay.next(CALL, name).payload)
+            if _input_values(args) != input_values:
+                raise ReplayMismatchError(f"Replay expected {name}{tuple(input_values)}, "
+                                          f"got {name}{tuple(_input_values(args))}")
+            for obj, value in zip(_output_objects(args), output_values):
+                obj.value = value
+            return return_value
+
+        return _replay_call
+
+
+class ReplaySerial:
+    """Stand-in for a serial port that answers from a recording"""
+
+    def __init__(self, records, timed=False, channel=ROBOCLAW_CHANNEL):
+        self._replay = Replay(records, channel, timed)
+        self.is_open = True
+
+    def write(self, data):
+        record = self._replay.next(WRITE, "write")
+        if record.payload != bytes(data):
+            raise ReplayMismatchError(f"Replay expected write {record.payload!r}, got {data!r}")
+        return len(data)
+
+    def read(self, size=1):
+        payload = self._replay.next(READ, "read").payload
+        if len(payload) > size:
+            raise ReplayMismatchError(f"Replay read {len(payload)} bytes, requested {size}")
+        return payload
+
+    def open(self):
+        """Replays an Open of the communication, raises IOError if the recorded Open failed."""
+        payload = self._replay.next(OPEN, "Open").payload
+        if payload[:1] == OPEN_FAILED:
+            raise IOError(payload[1:].decode("utf-8"))
+        self.is_open = True
+        return CALL_VALUE.unpack(payload[1:])[0] if payload[1:] else None
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def flushInput(self):  # pylint: disable=invalid-name
+        pass
+
+    def flushOutput(self):  # pylint: disable=invalid-name
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def record_roboclaw_open(roboclaw, recorder):
+    """
+    Records every Open of the Roboclaw communication, and the serial port it opens.
+    Open replaces the serial port, e.g. when a step reopens the communication with a faulty port.
+    """
+    open_communication = roboclaw.Open
+
+    def _open(*args, **kwargs):
+        try:
+            return_value = open_communication(*args, **kwargs)
+        except IOError as err:
+            recorder.record(ROBOCLAW_CHANNEL, OPEN, "Open", OPEN_FAILED + str(err).encode("utf-8"))
+            raise
+        payload = OPEN_SUCCEEDED
+        if isinstance(return_value, int):
+            payload += CALL_VALUE.pack(return_value)
+        recorder.record(ROBOCLAW_CHANNEL, OPEN, "Open", payload)
+        if roboclaw._port is not None and not isinstance(roboclaw._port, RecordingSerial):
+            roboclaw._port = RecordingSerial(roboclaw._port, recorder)
+        return return_value
+
+    roboclaw.Open = _open
+
+
+def replay_roboclaw_open(roboclaw, port):
+    """Replays every Open of the Roboclaw communication instead of opening a serial port."""
+
+    def _open(*_args, **_kwargs):
+        return_value = port.open()
+        roboclaw._port = port
+        return return_value
+
+    roboclaw.Open = _open
+
+
+def install_transport(context):
+    """
+    Records or replays the communication of context.epos and context.roboclaw, as selected in
+    the userdata. Does nothing if no transport mode is selected.
+    """
+    mode = context.config.userdata.get(TRANSPORT_USERDATA)
+    if mode is None:
+        return
+    log_file = context.config.userdata.get(TRANSPORT_LOG_USERDATA, DEFAULT_TRANSPORT_LOG)
+
+    if mode == "record":
+        recorder = TransportRecorder(log_file)
+        atexit.register(recorder.close)
+        context.epos.epos = RecordingLibrary(context.epos.epos, recorder)
+        # The Roboclaw serial port only exists once the communication has been opened
+        if getattr(context.roboclaw, "_port", None) is not None:
+            context.roboclaw._port = RecordingSerial(context.roboclaw._port, recorder)
+        record_roboclaw_open(context.roboclaw, recorder)
+    elif mode in ("replay", "replay_timed"):
+        records = read_transport_log(log_file)
+        timed = mode == "replay_timed"
+        context.epos.epos = ReplayLibrary(records, timed)
+        context.roboclaw._port = ReplaySerial(records, timed)
+        replay_roboclaw_open(context.roboclaw, context.roboclaw._port)
+    else:
+        raise ValueError(f"Incorrect value for transport: {mode}")
@@ -0,0 +1,310 @@
+"""
+Runs the behave features in parallel worker processes and merges the results into one report.
+
+The scenarios are grouped by tag and spread over the workers so that each worker gets an equal
+share of the scenarios (scenario outlines are weighted by their number of examples). Each worker
+is a separate behave process and therefore sets up its own launcher and mocked motor interfaces.
+The worker id and the server port to use are passed to the environment as userdata:
+    -D worker_id=<n> -D server_port=<base port + n>
+
+With "--tier api" only the scenarios whose steps never use the browser are run. The step
+implementations are analysed without being imported, and the workers are started with
+"-D browser=none" so that the environment can skip starting the browser.
+
+Example:
+    python run_features.py --workers 4 -- --tags=~@manual
+    python run_features.py --tier api
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import parse
+from behave.parser import parse_file
+
+from features.step_dispatch import StepDispatchIndex
+
+FEATURE_DIRECTORY = "features"
+STEP_DIRECTORY = os.path.join(FEATURE_DIRECTORY, "steps")
+STEP_DECORATORS = ["given", "when", "then", "step"]
+TIERS = ["all", "api"]
+# Tags used to group scenarios, a scenario is put in the group of the first tag it has
+SHARD_TAGS = ["api", "new_gui", "skip_mobile", "landscape"]
+UNTAGGED = "untagged"
+DEFAULT_BASE_PORT = 5100
+DEFAULT_REPORT = "parallel_report.json"
+# Scenario statuses that make the feature status the same, in order of precedence
+FAILING_STATUSES = ["hook_error", "error", "failed", "undefined"]
+
+
+def collect_scenarios(feature_directory=FEATURE_DIRECTORY, step_index=None):
+    """
+    Parses all feature files and returns the scenarios that can be run.
+    :param feature_directory: Directory with the .feature files
+    :param step_index: If given, only scenarios that do not use the browser are returned
+    :return: List of dicts with location, shard tag and weight of each scenario
+    """
+    scenarios = []
+    for feature_file in sorted(glob.glob(os.path.join(feature_directory, "*.feature"))):
+        feature = parse_file(feature_file)
+        if feature is None:
+            continue
+        for scenario in iter_scenarios(feature):
+            if step_index is not None and step_index.uses_browser(scenario):
+                continue
+            # The effective tags include the tags of the feature and of the rule
+            tags = set(scenario.effective_tags)
+            shard_tag = next((tag for tag in SHARD_TAGS if tag in tags), UNTAGGED)
+            # Scenario outlines are run once per example row
+            weight = len(getattr(scenario, "scenarios", [])) or 1
+            scenarios.append({"location": f"{feature_file}:{scenario.line}",
+                              "tag": shard_tag,
+                              "weight": weight})
+    return scenarios
+
+
+def iter_scenarios(feature):
+    """Yields the scenarios and scenario outlines of a feature, including the ones in rules."""
+    yield from feature.scenarios
+    for rule in getattr(feature, "rules", []):
+        yield from rule.scenarios
+
+
+class StepIndex:
+    """
+    Index of the step implementations, used to find out which steps use the browser.
+    The step modules are parsed instead of imported so that no browser or launcher dependencies
+    are loaded. Steps are matched in the same way as behave does: in registration order, with
+    the parse matcher and within the step type (given, when, then).
+    """
+
+    def __init__(self, step_directory=STEP_DIRECTORY):
+        self.steps = {step_type: [] for step_type in STEP_DECORATORS}
+        self._browser_steps = set()
+        self._match_cache = {}
+        for step_file in sorted(glob.glob(os.path.join(step_directory, "*.py"))):
+            self._add_step_module(step_file)
+        self._indexes = {step_type: StepDispatchIndex(pattern for _, (_, pattern)
+                                                      in self._candidates(step_type))
+                         for step_type in STEP_DECORATORS}
+
+    def _add_step_module(self, step_file):
+        with open(step_file, encoding="utf-8") as file:
+            module = ast.parse(file.read(), filename=step_file)
+
+        functions = [node for node in module.body if isinstance(node, ast.FunctionDef)]
+        # Helper functions are looked up by name. Step functions are often named step_impl and
+        # redefined, so they are only reachable through their patterns.
+        named_functions = {function.name: function for function in functions}
+        for function in functions:
+            for step_type, pattern in _step_patterns(function):
+                step = (step_type, pattern)
+                self.steps[step_type].append((parse.compile(pattern, case_sensitive=True), step))
+                if _uses_browser(function, named_functions, set()):
+                    self._browser_steps.add(step)
+
+    def find_step(self, step_type, text):
+        """Returns (step_type, pattern) for the step implementation matching the step text."""
+        key = (step_type, text)
+        if key not in self._match_cache:
+            candidates = self._candidates(step_type)
+            self._match_cache[key] = next(
+                (candidates[number][1] for number in self._indexes[step_type].candidates(text)
+                 if candidates[number][0].parse(text) is not None), None)
+        return self._match_cache[key]
+
+    def _candidates(self, step_type):
+        if step_type == "step":
+            return self.steps["step"]
+        return self.steps[step_type] + self.steps["step"]
+
+    def uses_browser(self, scenario):
+        """
+        Checks if any step in the scenario (including background and all examples of a
+        scenario outline) may use the browser. Undefined steps are treated as using it.
+        """
+        scenarios = getattr(scenario, "scenarios", None) or [scenario]
+        for example_scenario in scenarios:
+            for step in example_scenario.all_steps:
+                step_implementation = self.find_step(step.step_type, step.name)
+                if step_implementation is None or step_implementation in self._browser_steps:
+                    return True
+        return False
+
+
+def _step_patterns(function):
+    """Yields (step_type, pattern) for every step decorator of a function."""
+    for decorator in function.decorator_list:
+        if isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name) \
+                and decorator.func.id in STEP_DECORATORS and decorator.args:
+            pattern = decorator.args[0]
+            if isinstance(pattern, ast.Constant) and isinstance(pattern.value, str):
+                yield decorator.func.id, pattern.value
+
+
+def _uses_browser(function, named_functions, visited):
+    """
+    Checks if a function uses context.browser, directly or through helper functions.
+    Nested steps run with context.execute_steps are treated as using the browser.
+    """
+    visited.add(function.name)
+    for node in ast.walk(function):
+        if isinstance(node, ast.Attribute) and node.attr in ("browser", "execute_steps"):
+            return True
+        if isinstance(node, ast.Name) and node.id in named_functions \
+                and node.id not in visited \
+                and _uses_browser(named_functions[node.id], named_functions, visited):
+            return True
+    return False
+
+
+def create_shards(scenarios, workers):
+    """
+    Splits the scenarios into one shard per worker.
+    Scenarios are handled tag group by tag group and added to the shard with the least work, so
+    that the scenarios in a shard stay grouped by tag and all shards get a similar amount of work.
+    :param scenarios: Scenarios as returned by collect_scenarios
+    :param workers: Number of shards to create
+    :return: List of shards, each a list of scenario locations
+    """
+    shards = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for tag in SHARD_TAGS + [UNTAGGED]:
+        tag_scenarios = [scenario for scenario in scenarios if scenario["tag"] == tag]
+        for scenario in sorted(tag_scenarios, key=lambda item: item["weight"], reverse=True):
+            worker = loads.index(min(loads))
+            shards[worker].append(scenario["location"])
+            loads[worker] += scenario["weight"]
+    return [shard for shard in shards if shard]
+
+
+def start_worker(worker_id, locations, report_file, base_port, behave_args):
+    """Starts a behave process for the given scenario locations."""
+    command = [sys.executable, "-m", "behave",
+               "--format", "json", "--outfile", report_file,
+               "--format", "progress",
+               "-D", f"worker_id={worker_id}",
+               "-D", f"server_port={base_port + worker_id}"]
+    command += behave_args + locations
+    return subprocess.Popen(command)
+
+
+def merge_reports(report_files):
+    """
+    Merges the json reports from the workers into one report with one entry per feature.
+    :param report_files: json report files written by the workers
+    :return: List of features in behave json format
+    """
+    features = {}
+    for report_file in report_files:
+        try:
+            with open(report_file, encoding="utf-8") as file:
+                report = json.load(file)
+        except (OSError, ValueError):
+            # A worker that crashed may not have written a (complete) report
+            continue
+        for feature in report:
+            merged_feature = features.setdefault(feature["location"],
+                                                 dict(feature, elements=[]))
+            merged_feature["elements"].extend(feature.get("elements", []))
+
+    merged_report = list(features.values())
+    for feature in merged_report:
+        feature["elements"].sort(key=_element_line)
+        feature["status"] = _feature_status(feature)
+    return merged_report
+
+
+def _feature_status(feature):
+    """
+    Returns the status of a feature from the status of its scenarios, in the same way as behave:
+    the first of FAILING_STATUSES that any scenario has, otherwise passed if any scenario passed.
+    """
+    statuses = {element.get("status") for element in feature["elements"]
+                if element.get("type") != "background"}
+    failing_status = next((status for status in FAILING_STATUSES if status in statuses), None)
+    if failing_status is not None:
+        return failing_status
+    if "passed" in statuses:
+        return "passed"
+    return feature.get("status", "skipped")
+
+
+def _element_line(element):
+    """Returns the line number from the location of a scenario in a json report."""
+    _, _, line = element.get("location", "").rpartition(":")
+    return int(line) if line.isdigit() else 0
+
+
+def summarize(report):
+    """Returns a dict with the number of scenarios per status."""
+    summary = {}
+    for feature in report:
+        for element in feature["elements"]:
+            if element.get("type") == "background":
+                continue
+            status = element.get("status", "untested")
+            summary[status] = summary.get(status, 0) + 1
+    return summary
+
+
+def run(workers, report_file, base_port, behave_args, tier="all"):
+    """
+    Runs the scenarios of a tier in parallel and writes the merged report.
+    :return: 0 if all workers passed, otherwise 1
+    """
+    if tier == "api":
+        scenarios = collect_scenarios(step_index=StepIndex())
+        behave_args = ["-D", "browser=none"] + behave_args
+    else:
+        scenarios = collect_scenarios()
+    if not scenarios:
+        print(f"No scenarios found for tier '{tier}'")
+        return 0
+
+    shards = create_shards(scenarios, workers)
+    start_time = time.monotonic()
+    with tempfile.TemporaryDirectory() as report_directory:
+        report_files = [os.path.join(report_directory, f"worker_{worker_id}.json")
+                        for worker_id in range(len(shards))]
+        processes = [start_worker(worker_id, shard, report_files[worker_id], base_port,
+                                  behave_args)
+                     for worker_id, shard in enumerate(shards)]
+        return_codes = [process.wait() for process in processes]
+        report = merge_reports(report_files)
+
+    with open(report_file, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(summarize(report).items()))
+    print(f"\n{len(shards)} workers finished in {time.monotonic() - start_time:.1f} s: {summary}")
+    print(f"Merged report written to {report_file}")
+    return 0 if all(code == 0 for code in return_codes) else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: number of cores)")
+    parser.add_argument("--report", default=DEFAULT_REPORT,
+                        help=f"merged json report (default: {DEFAULT_REPORT})")
+    parser.add_argument("--tier", choices=TIERS, default="all",
+                        help="'api' runs only the scenarios that do not use the browser")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT,
+                        help=f"server port of the first worker (default: {DEFAULT_BASE_PORT})")
+    parser.add_argument("behave_args", nargs="*",
+                        help="extra arguments passed to behave, given after --")
+    args = parser.parse_args()
+    sys.exit(run(max(args.workers, 1), args.report, args.base_port, args.behave_args,
+                 args.tier))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Tests of the parallel feature runner
+"""
+import json
+
+from run_features import collect_scenarios, create_shards, merge_reports, _feature_status, \
+    StepIndex, UNTAGGED
+
+RULE_SCENARIO = "features/automatic_positioning_commands.feature:9"
+
+
+def scenario(location, tag=UNTAGGED, weight=1):
+    return {"location": location, "tag": tag, "weight": weight}
+
+
+def element(location, status, element_type="scenario"):
+    return {"type": element_type, "location": location, "status": status}
+
+
+def write_report(tmp_path, name, report):
+    report_file = tmp_path / name
+    report_file.write_text(json.dumps(report), encoding="utf-8")
+    return str(report_file)
+
+
+def test_collect_scenarios_includes_rules():
+    locations = [item["location"] for item in collect_scenarios()]
+    assert RULE_SCENARIO in locations
+    assert len(locations) == len(set(locations))
+
+
+def test_api_tier_includes_rule_scenarios():
+    # The rule scenario only posts requests and asserts on the responses
+    locations = [item["location"] for item in collect_scenarios(step_index=StepIndex())]
+    assert RULE_SCENARIO in locations
+
+
+def test_api_tier_excludes_browser_scenarios():
+    api_locations = {item["location"] for item in collect_scenarios(step_index=StepIndex())}
+    all_locations = {item["location"] for item in collect_scenarios()}
+    assert api_locations < all_locations
+    assert not any("button_visibility" in location for location in api_locations)
+
+
+def test_create_shards_balances_weight():
+    scenarios = [scenario("a.feature:1", weight=4), scenario("a.feature:9", weight=2),
+                 scenario("b.feature:1", weight=1), scenario("b.feature:5", weight=1)]
+    shards = create_shards(scenarios, 2)
+    assert sorted(shards) == [["a.feature:1"], ["a.feature:9", "b.feature:1", "b.feature:5"]]
+
+
+def test_create_shards_keeps_tag_groups_together():
+    scenarios = [scenario("a.feature:1", "api"), scenario("a.feature:5", "api"),
+                 scenario("b.feature:1"), scenario("b.feature:5")]
+    shards = create_shards(scenarios, 2)
+    assert sorted(shards) == [["a.feature:1", "b.feature:1"], ["a.feature:5", "b.feature:5"]]
+
+
+def test_create_shards_drops_empty_shards():
+    assert create_shards([scenario("a.feature:1")], 4) == [["a.feature:1"]]
+
+
+def test_merge_reports_recomputes_feature_status(tmp_path):
+    passed_report = [{"location": "f.feature:1", "status": "passed",
+                      "elements": [element("f.feature:9", "passed")]}]
+    failed_report = [{"location": "f.feature:1", "status": "failed",
+                      "elements": [element("f.feature:3", "failed")]}]
+    report = merge_reports([write_report(tmp_path, "a.json", passed_report),
+                            write_report(tmp_path, "b.json", failed_report)])
+    assert len(report) == 1
+    assert report[0]["status"] == "failed"
+    assert [item["location"] for item in report[0]["elements"]] == ["f.feature:3",
+                                                                     "f.feature:9"]
+
+
+def test_merge_reports_skips_missing_and_broken_reports(tmp_path):
+    broken_report = tmp_path / "broken.json"
+    broken_report.write_text("[{", encoding="utf-8")
+    report = merge_reports([str(tmp_path / "missing.json"), str(broken_report)])
+    assert not report
+
+
+def test_feature_status():
+    assert _feature_status({"elements": [element("f:1", "passed"),
+                                         element("f:5", "undefined"),
+                                         element("f:9", "failed")]}) == "failed"
+    assert _feature_status({"elements": [element("f:1", "passed"),
+                                         element("f:5", "skipped")]}) == "passed"
+    # The status of a background does not count
+    assert _feature_status({"elements": [element("f:1", "failed", "background"),
+                                         element("f:5", "passed")]}) == "passed"
+    assert _feature_status({"status": "skipped",
+                            "elements": [element("f:1", "skipped")]}) == "skipped"
@@ -6,25 +6,34 @@ Step implementations for behave tests
 # function-redefined to not get warnings for each step_impl
 # missing-function-docstring since the step name shall be descriptive (no need for doc string)
 import time
+import threading
 from ctypes import c_uint
-from unittest.mock import Mock, call
-import ast
+from unittest.mock import Mock, call, DEFAULT
+from urllib.parse import urldefrag
 
-from nose.tools import assert_equal, assert_true, assert_not_equal, assert_in
+from nose.tools import assert_equal, assert_true, assert_in
 import selenium.common
 from behave import given, when, then
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver import ActionChains
 from selenium.webdriver.support.color import Color
 from features.environment import mock_epos_interface, APP_URL, APP_URL_OLD, AUTOMATIC_COMMAND_URL,\
     MOTOR_CONTROL_URL
+from features.request_body import decode_request_body
+from features.request_log import RequestLog
+from features.adaptive_wait import wait_until, record_wait_time
+from features.clock import get_clock, WALL_CLOCK
+from features.simulated_motor import use_simulated_motors, install_simulated_motors, \
+    is_motor_simulated
 from models.launcher_model import create_motor_list, NotReadyException
 from controls.launcher_control import LauncherControl
 
 AUTOMATIC_COMMANDS = LauncherControl.AUTOMATIC_COMMANDS
 MOCKED_MOTOR_COMMANDS = ["forward", "backward", "stop", "move_to_position"]
+RECORDED_MOTOR_COMMANDS = MOCKED_MOTOR_COMMANDS + ["move_to_min_position",
+                                                   "move_to_max_position",
+                                                   "move_to_launch_position"]
 BUTTON_PRIMARY_COLOR = "#FCE0CF"
 MANUAL_BUTTON_PRIMARY_COLOR = "#FFFBFA"
 BUTTON_ACTIVE_COLOR = "#F7AE82"
@@ -44,9 +53,62 @@ VALID_DRONE_POSITION = "100"
 SET_BUTTON = "set-manual-position-btn"
 DRONE_POSITION = "manual-position-input"
 
-# Default value for sleep interval between evaluation calls, used when waiting for elements or text
-# to be present
-ELEMENT_POLL_FREQUENCY = 0.1
+# Resolves as soon as the element text contains the expected text, or with false at the timeout
+WAIT_FOR_TEXT_SCRIPT = """
+const [elementId, expectedText, timeoutMs, done] = arguments;
+const element = document.getElementById(elementId);
+if (!element) { done(null); return; }
+if (element.textContent.includes(expectedText)) { done(true); return; }
+const observer = new MutationObserver(() => {
+    if (element.textContent.includes(expectedText)) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+const timer = setTimeout(() => { observer.disconnect(); done(false); }, timeoutMs);
+observer.observe(element, {childList: true, characterData: true, subtree: true});
+"""
+
+# Returns the state of each element in arguments[0] (a list of IDs), or null if it does not exist
+PROBE_ELEMENTS_SCRIPT = """
+return arguments[0].map(id => {
+    const element = document.getElementById(id);
+    if (!element) { return null; }
+    const style = window.getComputedStyle(element);
+    const displayed = element.checkVisibility
+        ? element.checkVisibility({checkOpacity: true, checkVisibilityCSS: true})
+        : style.display !== 'none' && style.visibility !== 'hidden'
+            && element.getClientRects().length > 0;
+    return {
+        displayed: displayed,
+        text: element.innerText,
+        background_color: style.backgroundColor,
+        enabled: !element.disabled
+    };
+});
+"""
+
+# Request log for the captured requests of the current browser, see get_request_log
+REQUEST_LOG_CACHE = {}
+
+# Page reuse statistics per feature, see enter_start_page
+PAGE_REUSE_STATS = {}
+
+# Restores the parts of the start page that scenarios change, used instead of reloading the page
+RESET_PAGE_STATE_SCRIPT = f"""
+for (const id of ['{MAIN_VIEW_STATUS_MESSAGE}', '{MANUAL_VIEW_STATUS_MESSAGE}']) {{
+    const element = document.getElementById(id);
+    if (element) {{ element.textContent = ''; }}
+}}
+const manualView = document.getElementById('manual-command-view');
+if (manualView) {{ manualView.removeAttribute('data-manual-command-view-opened'); }}
+"""
+
+# Upper bound in seconds for how long an assertion waits for a mocked motor command to be called
+MOTOR_CALL_WAIT_TIME = 0.5
+# Time in seconds that an assertion keeps watching for repeated calls after the first call
+MOTOR_CALL_SETTLE_TIME = 0.1
 
 
 @given('user has prepared for a launch')
@@ -104,9 +166,17 @@ def step_impl(context, operational):
 def set_all_motors_operational(context):
     # Mock all motors to be able to assert that the correct motor function calls has been made
     # Launch motor will be restored to non mocked version in before_scenario
-    for name, motor in context.launcher.motors.items():
-        context.launcher.motors[name] = Mock(motor)
-        context.launcher.motors[name].get_actual_position = Mock(return_value=0)
+    if use_simulated_motors(context):
+        # The mocks wrap simulated motors that move and report their actual position
+        install_simulated_motors(context)
+    else:
+        for name, motor in context.launcher.motors.items():
+            context.launcher.motors[name] = Mock(motor)
+            context.launcher.motors[name].get_actual_position = Mock(return_value=0)
+
+    context.motor_call_recorder = MotorCallRecorder()
+    for motor in context.launcher.motors.values():
+        context.motor_call_recorder.record(motor)
 
 
 @given('all motors are not operational')
@@ -169,9 +239,11 @@ def step_impl(context, status):
     if status == "ready":
         context.launcher.assert_ready_to_launch = Mock()
 
-        # Mock waiting to prevent timeout and IOError
-        context.launcher.motors['drone_position'].wait_until_motor_stopped = Mock()
-        context.launcher.motors['drone_position'].set_charger_state = Mock()
+        # Simulated motors move to the launch position and signal when they have stopped
+        if not is_motor_simulated(context, "drone_position"):
+            # Mock waiting to prevent timeout and IOError
+            context.launcher.motors['drone_position'].wait_until_motor_stopped = Mock()
+            context.launcher.motors['drone_position'].set_charger_state = Mock()
     elif status == "not ready":
         context.launcher.assert_ready_to_launch = Mock(side_effect=NotReadyException)
     else:
@@ -315,14 +387,28 @@ def step_impl(context):
 
 @when('measurements request is posted')
 def step_impl(context):
-    context.response = context.server.get_app().test_client().get("/measurements")
+    context.response = get_test_client(context).get("/measurements")
 
 
 @when('user enters the start page')
-def step_impl(context):
+def enter_start_page(context):
     # Only load the page if necessary
-    if context.browser.current_url != APP_URL:
+    stats = PAGE_REUSE_STATS.setdefault(context.feature.name,
+                                        {"hits": 0, "misses": 0, "load_time": 0.0})
+    # Hits and misses are counted once per scenario, for the first time the page is entered
+    first_entry = not getattr(context, "page_state_restored", False)
+    if is_same_page(context.browser.current_url, APP_URL):
+        # Restore the page state once per scenario, later steps shall see the state they changed
+        if first_entry:
+            context.browser.execute_script(RESET_PAGE_STATE_SCRIPT)
+            stats["hits"] += 1
+    else:
+        start_time = time.monotonic()
         context.browser.get(url=APP_URL)
+        if first_entry:
+            stats["load_time"] += time.monotonic() - start_time
+            stats["misses"] += 1
+    context.page_state_restored = True
 
 
 @when('{motor} moves to position {position}')
@@ -334,7 +420,9 @@ def step_impl(context, motor, position):
 def step_impl(context, button):
     button_id = "script_" + button.replace(" ", "_")
     button_element = find_element(context, button_id)
+    release_start_time = time.monotonic()
     button_element.click()
+    context.button_release_window = (release_start_time, time.monotonic())
 
 
 @when('back arrow button is clicked')
@@ -357,13 +445,10 @@ def step_impl(context, motor, position):
 
 @when('user holds {button} and moves cursor away')
 def step_impl(context, button):
-    for status_indication_id in ["status_indication", "status-indication__message"]:
-        try:
-            context.browser.find_element(By.ID, status_indication_id)
-            element_name = status_indication_id
-            break
-        except selenium.common.exceptions.NoSuchElementException:
-            element_name = None
+    element_states = probe_elements(context.browser, ["status_indication",
+                                                      "status-indication__message"])
+    element_name = next((element_id for element_id, state in element_states.items()
+                         if state is not None), None)
 
     if element_name is None:
         raise selenium.common.exceptions.NoSuchElementException("No status indication element")
@@ -376,14 +461,16 @@ def step_impl(context, button):
     actions = ActionChains(context.browser)
     actions.click_and_hold(button_element)
     actions.perform()
-    # Move the cursor away from element
+    # Move the cursor away from element, which releases the button
+    release_start_time = time.monotonic()
     move_cursor_away(context)
+    context.button_release_window = (release_start_time, time.monotonic())
 
 
 @when('user holds {button}')
 def step_impl(context, button):
     # Checks if test is run on URL for old or new page as element IDs are named differently.
-    if context.browser.current_url == APP_URL:
+    if is_same_page(context.browser.current_url, APP_URL):
         button_element = find_element(context, button)
     else:
         button_element = find_element(context, "script_" + button)
@@ -394,10 +481,15 @@ def step_impl(context, button):
 @when('user is holding and then releases {button}')
 def hold_and_release_button(context, button):
     button_element = find_element(context, button)
+    # Requests caused by the click are the ones after this position in the request log
+    context.request_cursor = get_request_log(context).position()
     actions = ActionChains(context.browser)
     actions.click_and_hold(button_element)
     actions.release(button_element)
+    # The button is released at the end of the actions, somewhere within the perform call
+    release_start_time = time.monotonic()
     actions.perform()
+    context.button_release_window = (release_start_time, time.monotonic())
 
 
 @when('{motor} {command} request is posted')
@@ -432,7 +524,7 @@ def click_button(context, command):
 @when('one sec has passed')
 def step_impl(context):
     if context.browser:
-        time.sleep(1)
+        get_clock(context).sleep(1)
 
 
 @when('{button} is hovered')
@@ -535,6 +627,7 @@ def step_impl(context, motor):
     motor_list = create_motor_list(motor)
     for motor_name in motor_list:
         assert_motor_command_called_once(context, "stop", motor_name)
+        record_stop_latency(context, motor_name)
 
 
 @then('response contains all motors at position {position:d}')
@@ -567,27 +660,22 @@ def step_impl(context, message_text):
 
 @then('{motor} position shall be shown as {position} within {response_time:f} seconds')
 def step_impl(context, motor, position, response_time):
-    if context.browser.current_url == APP_URL_OLD:
+    if is_same_page(context.browser.current_url, APP_URL_OLD):
         position_element_name = motor + "_pos"
     else:
         position_element_name = MOTOR_POSITION
-    wait_until_text_present_in_element(context, position_element_name, position, response_time)
+    wait_until_text_changed_in_element(context, position_element_name, position, response_time)
 
 
 @then('status indication shall contain {message} within {response_time:f} seconds')
 def step_impl(context, message, response_time):
     # Checks for which status indication id to use
-    element_name = None
-    for status_indication_id in ["status_indication", "status-indication__message",
-                                 "manual-status-indication__message"]:
-        try:
-            element = context.browser.find_element(By.ID, status_indication_id)
-            # Check isDisplayed to not use a hidden status element
-            if element.is_displayed():
-                element_name = status_indication_id
-                break
-        except selenium.common.exceptions.NoSuchElementException:
-            element_name = None
+    element_states = probe_elements(context.browser, ["status_indication",
+                                                      "status-indication__message",
+                                                      "manual-status-indication__message"])
+    # Check if displayed to not use a hidden status element
+    element_name = next((element_id for element_id, state in element_states.items()
+                         if state is not None and state["displayed"]), None)
 
     if element_name is None:
         raise selenium.common.exceptions.NoSuchElementException("No status indication element")
@@ -680,33 +768,28 @@ def step_impl(context):
 def step_impl(context, automatic_command):
     context.browser.wait_for_request(AUTOMATIC_COMMAND_URL, timeout=SELENIUM_WIRE_WAIT_TIME)
     # Get body from last request and convert from byte to dict
-    driver_request_body = ast.literal_eval(context.browser.last_request.body.decode("utf-8"))
+    driver_request_body = decode_request_body(context.browser.last_request)
     assert_equal(driver_request_body["command"], automatic_command)
 
 
 @then('{command} shall be in POST request body')
 def step_impl(context, command):
-    request_evaluate = context.browser.wait_for_request(MOTOR_CONTROL_URL,
-                                                        timeout=SELENIUM_WIRE_WAIT_TIME)
+    request_log = get_request_log(context)
+    cursor = getattr(context, "request_cursor", 0)
+    request_evaluate = request_log.wait_for_next(MOTOR_CONTROL_URL, cursor,
+                                                 SELENIUM_WIRE_WAIT_TIME)
     # Short wait to allow catching consecutive requests to aid in troubleshooting
-    time.sleep(0.1)
+    get_clock(context).sleep(0.1)
     # When clicking, both motor command and stop requests are sent.
-    # The stop request will be the last motor_control request when re-fetching the request list
-    request_list = context.browser.requests
+    # The stop request will be the last motor_control request in capture order
+    request_list = request_log.find(MOTOR_CONTROL_URL, cursor)
     if command == "stop":
-        # The request list is expected to contain the motor command, stop and get_measurements
-        # Evaluate the last three elements in case of stop being sent before motor command
-        # List in reversed order so that the stop request will be the first motor_control request
-        for request in reversed(request_list[-3:]):
-            if "motor_control" in request.path:
-                request_evaluate = request
-                break
+        request_evaluate = request_list[-1]
     # Decode the request to verify the command
-    request_body = ast.literal_eval(request_evaluate.body.decode("utf-8"))
-    actual_command = request_body["command"]
+    actual_command = decode_request_body(request_evaluate)["command"]
 
     # Create a list of all request bodies to provide a better error message
-    request_body_list = [x.body for x in request_list if "app_motor_control" in x.url]
+    request_body_list = [request.body for request in request_list]
     assert_equal(command, actual_command, f"Actual command '{actual_command}' did not match "
                                           f"'{command}'. Requests: {request_body_list}")
 
@@ -722,9 +805,11 @@ def step_impl(context, automatic_command, response_time):
 @then('{motor} {command} is not run after {wait_time:f} seconds')
 def step_impl(context, motor, command, wait_time):
     motor_list = create_motor_list(motor)
+    # Wait once for all motors, the commands would have been run in parallel. The commands are
+    # run by the server in real time, so the wait cannot be simulated.
+    WALL_CLOCK.sleep(wait_time)
     for motor_name in motor_list:
         expected_call = getattr(context.launcher.motors[motor_name], command)
-        time.sleep(wait_time)
         expected_call.assert_not_called()
 
 
@@ -755,19 +840,16 @@ def step_impl(context, command):
 
 @then('manual view status indication shall be visible')
 def wait_until_manual_status_visible(context):
-    wait = WebDriverWait(context.browser, STANDARD_WAIT_TIME, poll_frequency=ELEMENT_POLL_FREQUENCY)
-    wait.until(EC.visibility_of_element_located((By.ID, MANUAL_VIEW_STATUS_TITLE)))
-    wait.until(EC.visibility_of_element_located((By.ID, MANUAL_VIEW_STATUS_MESSAGE)))
+    for element_name in [MANUAL_VIEW_STATUS_TITLE, MANUAL_VIEW_STATUS_MESSAGE]:
+        wait_until_page_contains_element(context, element_name, STANDARD_WAIT_TIME)
 
 
 @then('motor control request shall not be made')
 def step_impl(context):
-    # Captures all requests in a list
-    request_list = context.browser.requests
-
     # Verifies no request is a motor control request
-    for request in request_list:
-        assert_not_equal(str(request), MOTOR_CONTROL_URL)
+    request_log = get_request_log(context)
+    request_list = request_log.find(MOTOR_CONTROL_URL) + request_log.find_pending(MOTOR_CONTROL_URL)
+    assert_equal([], [str(request) for request in request_list])
 
 
 @then('{manual_command} title is shown at the top of the commands view')
@@ -791,7 +873,7 @@ def step_impl(context):
 def step_impl(context, value):
     context.browser.wait_for_request(MOTOR_CONTROL_URL, timeout=SELENIUM_WIRE_WAIT_TIME)
     # Get body from last request and convert from byte to dict
-    driver_request_body = ast.literal_eval(context.browser.last_request.body.decode("utf-8"))
+    driver_request_body = decode_request_body(context.browser.last_request)
     assert_equal(driver_request_body['position'], value,
                  f"Actual value: {driver_request_body['position']}"
                  f" did not match Expected value: {value}")
@@ -807,20 +889,54 @@ def post_request(context, complete_command, parameters=None, use_json=False):
     # Utilize the app instance that was set up in the environment
     request = f"/app_{complete_command}"
     if use_json:
-        response = context.server.get_app().test_client().post(request, json=parameters)
+        response = get_test_client(context).post(request, json=parameters)
     else:
-        response = context.server.get_app().test_client().post(request, data=parameters)
+        response = get_test_client(context).post(request, data=parameters)
 
     context.response = response
     return response
 
 
+def get_test_client(context):
+    """
+    Returns a test client for the app instance that was set up in the environment.
+    The clients are kept per app in context.test_clients, which setup_test_clients creates at
+    feature level, so one client is reused by all API requests in the feature. Cookies are not
+    used so that no state is carried between requests.
+    @param context: context from behave."""
+    test_clients = getattr(context, "test_clients", None)
+    if test_clients is None:
+        # Not set up for the feature, the clients are only kept for the current scenario
+        test_clients = context.test_clients = {}
+    app = context.server.get_app()
+    if app not in test_clients:
+        test_clients[app] = app.test_client(use_cookies=False)
+    return test_clients[app]
+
+
+def setup_test_clients(context):
+    """Creates the test client cache, to be called from before_feature."""
+    context.test_clients = {}
+
+
+def reset_test_clients(context):
+    """
+    Drops the test clients of apps other than the running one, to be called from
+    after_scenario so that a scenario that restarts the server does not leave a stale client.
+    """
+    test_clients = getattr(context, "test_clients", None)
+    if test_clients:
+        app = context.server.get_app()
+        for stale_app in [client_app for client_app in test_clients if client_app is not app]:
+            del test_clients[stale_app]
+
+
 def assert_motor_command_called_once(context, command, motor, argument=None):
     """Asserts that a specified command has been called for a mocked motor."""
-    # Need some time for the function to be called
-    wait_for_request()
     # Utilize the mocked motor to verify correct function call
     expected_call = getattr(context.launcher.motors[motor], command)
+    # Need some time for the function to be called, and for a repeated call to show up
+    wait_for_motor_call(context, expected_call, settle_time=MOTOR_CALL_SETTLE_TIME)
 
     if argument:
         expected_call.assert_called_once_with(argument)
@@ -828,13 +944,92 @@ def assert_motor_command_called_once(context, command, motor, argument=None):
         expected_call.assert_called_once()
 
 
+def record_stop_latency(context, motor):
+    """
+    Records the time from the button release until the motor was stopped, if both are known.
+    The release happens within the WebDriver call that performs it, so the latency is recorded
+    from the start of that call as "release to stop <motor>", an upper bound, and from its end
+    as "release returned to stop <motor>", a lower bound that is negative if the motor was
+    stopped before the call returned.
+    """
+    release_window = getattr(context, "button_release_window", None)
+    recorder = getattr(context, "motor_call_recorder", None)
+    if release_window is None or recorder is None:
+        return
+    stop_time = recorder.get_first_call_time(context.launcher.motors[motor].stop)
+    if stop_time is not None:
+        release_start_time, release_end_time = release_window
+        record_wait_time(f"release to stop {motor}", stop_time - release_start_time)
+        record_wait_time(f"release returned to stop {motor}", stop_time - release_end_time)
+
+
 def assert_button_enabled(context, button, enabled=True):
-    button_element = find_element(context, button)
-    assert_equal(enabled, button_element.is_enabled())
+    assert_equal(enabled, get_element_state(context, button)["enabled"])
 
 
 def wait_for_request():
-    time.sleep(0.5)
+    # The request is handled by the server in real time, so the wait cannot be simulated
+    WALL_CLOCK.sleep(0.5)
+
+
+def wait_for_motor_call(context, motor_command, response_time=MOTOR_CALL_WAIT_TIME,
+                        settle_time=0.0):
+    """
+    Waits until a mocked motor command has been called.
+    Falls back to a fixed wait if the motors were not mocked by set_all_motors_operational.
+    :param context: Context with the motor call recorder
+    :param motor_command: Mocked motor command that is expected to be called
+    :param response_time: Time in seconds to wait for the call
+    :param settle_time: Time in seconds to keep waiting after the first call, so that the calls
+        made right after it are also seen by the caller
+    """
+    recorder = getattr(context, "motor_call_recorder", None)
+    if recorder is None:
+        wait_for_request()
+    elif recorder.wait_for_call(motor_command, response_time):
+        WALL_CLOCK.sleep(settle_time)
+
+
+class MotorCallRecorder:
+    """
+    Records calls made to mocked motors and wakes up waiting assertions as soon as a call arrives.
+    The motor commands are called from the server thread while the assertions wait in the
+    behave thread.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        # Monotonic times of the calls per mocked motor command, by id of the mock
+        self._call_times = {}
+
+    def record(self, motor_mock):
+        """Notifies waiting assertions on every call to the mocked motor commands."""
+        for command in RECORDED_MOTOR_COMMANDS:
+            # Mocks are specced from the motor, so not all motors provide all commands
+            if hasattr(motor_mock, command):
+                motor_command = getattr(motor_mock, command)
+                motor_command.side_effect = self._create_notifier(motor_command)
+
+    def wait_for_call(self, motor_command, response_time):
+        """Returns True if the motor command was called within response_time seconds."""
+        with self._condition:
+            return self._condition.wait_for(lambda: motor_command.called, response_time)
+
+    def get_first_call_time(self, motor_command):
+        """Returns the monotonic time of the first call to the motor command, or None."""
+        with self._condition:
+            call_times = self._call_times.get(id(motor_command))
+            return call_times[0] if call_times else None
+
+    def _create_notifier(self, motor_command):
+        def _notify(*_args, **_kwargs):
+            with self._condition:
+                self._call_times.setdefault(id(motor_command), []).append(time.monotonic())
+                self._condition.notify_all()
+            # Let the mock return its return_value as if no side effect was set
+            return DEFAULT
+
+        return _notify
 
 
 def mock_motor_position(context, motor, position):
@@ -848,25 +1043,86 @@ def mock_motor_position(context, motor, position):
         context.launcher.motors[motor_name].get_actual_position = Mock(return_value=position)
 
 
+def get_request_log(context):
+    """
+    Returns the request log for the requests captured by selenium-wire in the browser.
+    The log is synchronized with the captured requests once per scenario, since they may have
+    been cleared between scenarios.
+    """
+    if REQUEST_LOG_CACHE.get("browser") is not context.browser:
+        REQUEST_LOG_CACHE["browser"] = context.browser
+        REQUEST_LOG_CACHE["log"] = RequestLog(context.browser)
+    request_log = REQUEST_LOG_CACHE["log"]
+    if not getattr(context, "request_log_synchronized", False):
+        request_log.synchronize()
+        context.request_log_synchronized = True
+    return request_log
+
+
+def is_same_page(current_url, url):
+    """Compares two URLs while ignoring fragments and trailing slashes."""
+    return urldefrag(current_url).url.rstrip("/") == urldefrag(url).url.rstrip("/")
+
+
+def get_page_reuse_stats():
+    """
+    Returns the page reuse statistics per feature, e.g. for reporting from an after_all hook.
+    The time saved is estimated from the average load time of the pages that were loaded.
+    """
+    report = {}
+    for feature_name, stats in PAGE_REUSE_STATS.items():
+        requests = stats["hits"] + stats["misses"]
+        average_load_time = stats["load_time"] / stats["misses"] if stats["misses"] else 0.0
+        report[feature_name] = {"hit_rate": stats["hits"] / requests if requests else 0.0,
+                                "hits": stats["hits"],
+                                "misses": stats["misses"],
+                                "time_saved": stats["hits"] * average_load_time}
+    return report
+
+
 def find_element(context, element):
-    if context.browser.current_url == APP_URL:
+    return context.browser.find_element(By.ID, get_element_id(context, element))
+
+
+def get_element_id(context, element):
+    """Returns the ID of an element, based on the naming used in the old or new page"""
+    if is_same_page(context.browser.current_url, APP_URL):
         # Used to separate motor control command ID from automatic commands
         # Example: pitch-btn from pitch-manual-up which needs "-btn" ending added in argument
         if '-' in element:
-            button_element = context.browser.find_element(By.ID, element)
+            element_id = element
         else:
-            button_element = context.browser.find_element(By.ID, f"{element}-btn")
+            element_id = f"{element}-btn"
     else:
         # Handle if the requested button has a whitespace
         element_id = element.replace(" ", "_")
-        button_element = context.browser.find_element(By.ID, element_id)
-    return button_element
+    return element_id
+
+
+def probe_elements(browser, element_ids):
+    """
+    Fetches the state of several elements with a single WebDriver call.
+    :param browser: webdriver
+    :param element_ids: IDs of the elements to probe
+    :return: Dict with the state of each element ID, or None for elements that do not exist. The
+    state is a dict with displayed, text, background_color and enabled.
+    """
+    element_states = browser.execute_script(PROBE_ELEMENTS_SCRIPT, list(element_ids))
+    return dict(zip(element_ids, element_states))
+
+
+def get_element_state(context, element):
+    """Locates and returns the state of an element, see probe_elements"""
+    element_id = get_element_id(context, element)
+    element_state = probe_elements(context.browser, [element_id])[element_id]
+    if element_state is None:
+        raise selenium.common.exceptions.NoSuchElementException(f"No element with ID {element_id}")
+    return element_state
 
 
 def get_button_color(context, button):
     """Locates and returns element hex color as string"""
-    button_element = find_element(context, button)
-    button_rgba = button_element.value_of_css_property("background-color")
+    button_rgba = get_element_state(context, button)["background_color"]
     return Color.from_string(button_rgba).hex.upper()
 
 
@@ -894,9 +1150,10 @@ def wait_until_text_present_in_element(context, element_name, expected_text, res
     :param expected_text: String with the text that is expected to be present
     :param response_time: Time in seconds to wait for the text to be present
     """
-    wait = WebDriverWait(context.browser, response_time, poll_frequency=ELEMENT_POLL_FREQUENCY)
     try:
-        wait.until(EC.text_to_be_present_in_element((By.ID, element_name), expected_text))
+        wait_until(context.browser,
+                   EC.text_to_be_present_in_element((By.ID, element_name), expected_text),
+                   response_time, f"text present in {element_name}")
     except selenium.common.exceptions.TimeoutException as err:
         element_text = context.browser.find_element(By.ID, element_name).text
         err.msg = f'Element "{element_name}" was expected to contain "{expected_text}"' \
@@ -904,32 +1161,59 @@ def wait_until_text_present_in_element(context, element_name, expected_text, res
         raise err
 
 
+def wait_until_text_changed_in_element(context, element_name, expected_text, response_time):
+    """
+    Waits until the expected text is present in the element without polling the element.
+    A MutationObserver in the page reports back as soon as the element text is updated. Falls
+    back to wait_until_text_present_in_element if the element does not exist yet.
+    :param context: Context with webdriver
+    :param element_name: ID of the element to be evaluated
+    :param expected_text: String with the text that is expected to be present
+    :param response_time: Time in seconds to wait for the text to be present
+    """
+    start_time = time.monotonic()
+    text_present = context.browser.execute_async_script(WAIT_FOR_TEXT_SCRIPT, element_name,
+                                                        expected_text, int(response_time * 1000))
+    if text_present:
+        record_wait_time(f"text changed in {element_name}", time.monotonic() - start_time)
+    elif text_present is None:
+        remaining_time = max(response_time - (time.monotonic() - start_time), 0)
+        wait_until_text_present_in_element(context, element_name, expected_text, remaining_time)
+    else:
+        element_text = context.browser.find_element(By.ID, element_name).text
+        raise selenium.common.exceptions.TimeoutException(
+            f'Element "{element_name}" was expected to contain "{expected_text}"'
+            f' but has text after the timeout occurred: "{element_text}"')
+
+
 def wait_until_page_contains_element(context, element_name, response_time):
-    wait = WebDriverWait(context.browser, response_time, poll_frequency=ELEMENT_POLL_FREQUENCY)
-    wait.until(EC.visibility_of_element_located((By.ID, element_name)))
+    wait_until(context.browser, EC.visibility_of_element_located((By.ID, element_name)),
+               response_time, f"visible {element_name}")
 
 
 def wait_until_element_has_color(context, element_name, expected_color, response_time):
-    wait = WebDriverWait(context.browser, response_time, poll_frequency=ELEMENT_POLL_FREQUENCY)
-    element = find_element(context, element_name)
+    element_id = get_element_id(context, element_name)
     timeout_message = f"Element '{element_name}' did not have expected color: {expected_color}."
-    wait.until(element_has_color(element, expected_color), message=timeout_message)
+    wait_until(context.browser, element_has_color(element_id, expected_color), response_time,
+               f"color of {element_id}", timeout_message)
 
 
-def element_has_color(element, expected_color):
+def element_has_color(element_id, expected_color):
     """
-    An expectation for checking that an element has a particular css class.
+    An expectation for checking that an element has a particular background color.
 
-      :param element: element which is expected to have the color
+      :param element_id: ID of the element which is expected to have the color
       :param expected_color: String with expected color in hex format
-      returns the WebElement once it has the expected color
+      returns the element state once it has the expected color
       """
 
-    def _predicate(_):
-        button_rgba = element.value_of_css_property("background-color")
-        actual_color = Color.from_string(button_rgba).hex.upper()
+    def _predicate(driver):
+        element_state = probe_elements(driver, [element_id])[element_id]
+        if element_state is None:
+            return False
+        actual_color = Color.from_string(element_state["background_color"]).hex.upper()
         if expected_color == actual_color:
-            return element
+            return element_state
         return False
 
     return _predicate